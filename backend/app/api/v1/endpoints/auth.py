@@ -1,18 +1,26 @@
-from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import re
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import exists, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload, selectinload
+from sqlalchemy.sql import func
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 
-from app.core.database import get_db
+from app.core.cache import cache
+from app.core.database import STRICT_LOADING, AsyncSessionLocal, get_async_db
 from app.core.auth import (
     authenticate_user, 
     create_access_token, 
     create_refresh_token,
     get_password_hash,
     verify_token,
-    get_current_user
+    get_current_user,
+    get_cached_user
 )
 from app.models.user import User
 from app.models.organization import Organization
@@ -20,6 +28,17 @@ from app.models.user import OrganizationMember, UserRole, MembershipStatus
 
 router = APIRouter()
 
+# Slug sanitization patterns
+SLUG_INVALID_CHARS = re.compile(r'[^a-zA-Z0-9\s]')
+SLUG_WHITESPACE = re.compile(r'\s+')
+SLUG_INSERT_ATTEMPTS = 2
+
+# Largest /organizations page a caller may ask for
+ORGANIZATIONS_MAX_PAGE_SIZE = 200
+
+# Role names accepted in requests, resolved with a dict lookup instead of an enum value scan
+_ROLE_MAP = {role.value: role for role in UserRole}
+
 # Pydantic models
 class UserRegister(BaseModel):
     email: EmailStr
@@ -48,197 +67,305 @@ class MembershipApprovalRequest(BaseModel):
     action: str  # "approve" or "deny"
     role: Optional[str] = None  # Role to assign if approving
 
-@router.post("/register")
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+# Response models (routes use response_model_exclude_unset so each response
+# keeps exactly the keys the handler sets)
+class UserSummary(BaseModel):
+    id: int
+    email: str
+    username: Optional[str] = None
+    full_name: str
+    organization_id: Optional[int] = None
+    organization_name: Optional[str] = None
+    role: Optional[str] = None
+
+class OrganizationSummary(BaseModel):
+    id: int
+    name: str
+    slug: Optional[str] = None
+
+class RegisterResponse(BaseModel):
+    message: str
+    user: UserSummary
+    organization: Optional[OrganizationSummary] = None
+    access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
+    token_type: Optional[str] = None
+    membership_status: str
+    requested_role: Optional[str] = None
+    role: Optional[str] = None
+    can_login: bool
+
+class LoginResponse(BaseModel):
+    can_login: bool
+    membership_status: str
+    message: Optional[str] = None
+    organization: Optional[OrganizationSummary] = None
+    requested_role: Optional[str] = None
+    access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
+    token_type: Optional[str] = None
+    user: Optional[UserSummary] = None
+
+class AccessTokenResponse(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+
+class UserOrganization(BaseModel):
+    id: int
+    name: str
+    slug: str
+    role: Optional[str]
+
+class CurrentUserResponse(BaseModel):
+    id: int
+    email: str
+    username: str
+    full_name: str
+    is_active: bool
+    is_verified: bool
+    organizations: List[UserOrganization]
+
+class PendingMembershipResponse(BaseModel):
+    id: int
+    user: UserSummary
+    organization: OrganizationSummary
+    requested_role: str
+    joined_at: datetime
+
+class MembershipApprovalResponse(BaseModel):
+    message: str
+    user: UserSummary
+    organization: OrganizationSummary
+    assigned_role: Optional[str] = None
+    status: str
+
+async def get_organization_by_id(organization_id: int) -> Optional[Organization]:
+    """Look up an organization on its own session so it can run alongside request queries"""
+    async with AsyncSessionLocal() as db:
+        return await db.get(Organization, organization_id)
+
+@router.post("/register", response_model=RegisterResponse, response_model_exclude_unset=True)
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
     """Register a new user with organization membership request"""
     
-    # Check if user already exists
-    existing_user = db.query(User).filter(
-        (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
+    # Validate requested role before touching the database
+    requested_role = _ROLE_MAP.get(user_data.requested_role.lower())
+    if requested_role is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid role. Must be admin, member, or viewer"
+        )
     
-    if existing_user:
+    # Check if user already exists, looking up the requested organization concurrently
+    existing_user_query = db.scalar(
+        select(User.id)
+        .where(or_(User.email == user_data.email, User.username == user_data.username))
+        .limit(1)
+    )
+    if user_data.organization_id:
+        existing_user, organization = await asyncio.gather(
+            existing_user_query,
+            get_organization_by_id(user_data.organization_id)
+        )
+    else:
+        existing_user, organization = await existing_user_query, None
+    
+    if existing_user is not None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User with this email or username already exists"
         )
     
-    # Validate requested role
+    if user_data.organization_id and not organization:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Organization not found"
+        )
+    
+    # Create new user; INSERT ... RETURNING hands back the row (and its ID) in one round-trip
+    hashed_password = await asyncio.to_thread(get_password_hash, user_data.password)
     try:
-        requested_role = UserRole(user_data.requested_role.lower())
-    except ValueError:
+        db_user = await db.scalar(
+            insert(User).returning(User),
+            [{
+                "email": user_data.email,
+                "username": user_data.username,
+                "full_name": user_data.full_name,
+                "hashed_password": hashed_password,
+                "is_active": True,
+                "is_verified": True
+            }]
+        )
+    except IntegrityError:
+        # Lost a race with a concurrent registration for the same email/username
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid role. Must be admin, member, or viewer"
+            detail="User with this email or username already exists"
         )
-    
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
-    db_user = User(
-        email=user_data.email,
-        username=user_data.username,
-        full_name=user_data.full_name,
-        hashed_password=hashed_password,
-        is_active=True,
-        is_verified=True
-    )
-    
-    db.add(db_user)
-    db.flush()  # Get the user ID
-    
-    organization = None
+
     membership_status = MembershipStatus.PENDING
     user_role = None
     
-    try:
-        # Handle organization membership
-        if user_data.organization_id:
-            # Join existing organization (requires approval)
-            organization = db.query(Organization).filter(
-                Organization.id == user_data.organization_id
-            ).first()
-            
-            if not organization:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Organization not found"
-                )
-            
-            # Create pending membership
-            membership = OrganizationMember(
-                user_id=db_user.id,
-                organization_id=organization.id,
-                requested_role=requested_role,
-                role=None,  # Will be set when approved
-                status=MembershipStatus.PENDING
-            )
-            db.add(membership)
-            
-        elif user_data.organization_name:
-            # Create new organization (immediate admin access)
-            import re
-            slug = re.sub(r'[^a-zA-Z0-9\s]', '', user_data.organization_name.lower())
-            slug = re.sub(r'\s+', '-', slug.strip())
+    # Handle organization membership
+    if user_data.organization_id:
+        # Join existing organization with a pending membership (requires approval)
+        membership = OrganizationMember(
+            user_id=db_user.id,
+            organization_id=organization.id,
+            requested_role=requested_role,
+            role=None,  # Will be set when approved
+            status=MembershipStatus.PENDING
+        )
+        db.add(membership)
+        
+    elif user_data.organization_name:
+        # Create new organization (immediate admin access)
+        slug = SLUG_INVALID_CHARS.sub('', user_data.organization_name.lower())
+        slug = SLUG_WHITESPACE.sub('-', slug.strip())
+        
+        # Ensure unique slug: load all colliding slugs at once, then
+        # retry if a concurrent registration claims the same slug
+        original_slug = slug
+        for attempt in range(SLUG_INSERT_ATTEMPTS):
+            existing_slugs = set((await db.scalars(
+                select(Organization.slug).where(Organization.slug.like(f"{original_slug}%"))
+            )).all())
             
-            # Ensure unique slug
+            slug = original_slug
             counter = 1
-            original_slug = slug
-            while db.query(Organization).filter(Organization.slug == slug).first():
+            while slug in existing_slugs:
                 slug = f"{original_slug}-{counter}"
                 counter += 1
             
-            organization = Organization(
-                name=user_data.organization_name,
-                slug=slug,
-                description=f"Organization for {user_data.organization_name}",
-                is_public=True,
-                branding_enabled=True
-            )
-            
-            db.add(organization)
-            db.flush()  # Get the organization ID
-            
-            # Add user as admin (auto-approved)
-            from sqlalchemy.sql import func
-            membership = OrganizationMember(
-                user_id=db_user.id,
-                organization_id=organization.id,
-                requested_role=UserRole.ADMIN,
-                role=UserRole.ADMIN,
-                status=MembershipStatus.APPROVED,
-                approved_by=db_user.id,
-                approved_at=func.now()
-            )
-            db.add(membership)
-            membership_status = MembershipStatus.APPROVED
-            user_role = UserRole.ADMIN
-        
+            try:
+                async with db.begin_nested():
+                    organization = await db.scalar(
+                        insert(Organization).returning(Organization),
+                        [{
+                            "name": user_data.organization_name,
+                            "slug": slug,
+                            "description": f"Organization for {user_data.organization_name}",
+                            "is_public": True,
+                            "branding_enabled": True
+                        }]
+                    )
+                break
+            except IntegrityError:
+                continue
         else:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Must select an organization or create a new one"
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Could not allocate a unique organization slug, please try again"
             )
         
-        db.commit()
-        
-        # Return registration status
-        if membership_status == MembershipStatus.PENDING:
-            return {
-                "message": "Registration successful! Your membership request is pending admin approval.",
-                "user": {
-                    "id": db_user.id,
-                    "email": db_user.email,
-                    "username": db_user.username,
-                    "full_name": db_user.full_name,
-                },
-                "organization": {
-                    "id": organization.id,
-                    "name": organization.name,
-                    "slug": organization.slug
-                },
-                "membership_status": membership_status.value,
-                "requested_role": requested_role.value,
-                "can_login": False
-            }
-        else:
-            # Auto-approved (new organization admin)
-            access_token = create_access_token(data={"sub": str(db_user.id)})
-            refresh_token = create_refresh_token(data={"sub": str(db_user.id)})
-            
-            return {
-                "message": "Registration successful! You are now the admin of your organization.",
-                "access_token": access_token,
-                "refresh_token": refresh_token,
-                "token_type": "bearer",
-                "user": {
-                    "id": db_user.id,
-                    "email": db_user.email,
-                    "username": db_user.username,
-                    "full_name": db_user.full_name,
-                    "organization_id": organization.id,
-                    "organization_name": organization.name
-                },
-                "membership_status": membership_status.value,
-                "role": user_role.value if user_role else None,
-                "can_login": True
-            }
-        
-    except Exception as e:
-        db.rollback()
+        # Add user as admin (auto-approved)
+        membership = OrganizationMember(
+            user_id=db_user.id,
+            organization_id=organization.id,
+            requested_role=UserRole.ADMIN,
+            role=UserRole.ADMIN,
+            status=MembershipStatus.APPROVED,
+            approved_by=db_user.id,
+            approved_at=func.now()
+        )
+        db.add(membership)
+        membership_status = MembershipStatus.APPROVED
+        user_role = UserRole.ADMIN
+    
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Must select an organization or create a new one"
+        )
+    
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to create user: {str(e)}"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Registration conflicted with a concurrent change, please try again"
         )
+    
+    # Return registration status
+    if membership_status == MembershipStatus.PENDING:
+        return {
+            "message": "Registration successful! Your membership request is pending admin approval.",
+            "user": {
+                "id": db_user.id,
+                "email": db_user.email,
+                "username": db_user.username,
+                "full_name": db_user.full_name,
+            },
+            "organization": {
+                "id": organization.id,
+                "name": organization.name,
+                "slug": organization.slug
+            },
+            "membership_status": membership_status.value,
+            "requested_role": requested_role.value,
+            "can_login": False
+        }
+    else:
+        # Auto-approved (new organization admin); the new public organization
+        # must show up in the cached listing
+        await cache.invalidate_public_organizations()
+        
+        access_token = create_access_token(data={"sub": str(db_user.id)})
+        refresh_token = create_refresh_token(data={"sub": str(db_user.id)})
+        
+        return {
+            "message": "Registration successful! You are now the admin of your organization.",
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "token_type": "bearer",
+            "user": {
+                "id": db_user.id,
+                "email": db_user.email,
+                "username": db_user.username,
+                "full_name": db_user.full_name,
+                "organization_id": organization.id,
+                "organization_name": organization.name
+            },
+            "membership_status": membership_status.value,
+            "role": user_role.value if user_role else None,
+            "can_login": True
+        }
 
-@router.post("/login")
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+@router.post("/login", response_model=LoginResponse, response_model_exclude_unset=True)
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login user with email and password"""
     
-    user = authenticate_user(db, user_data.email, user_data.password)
-    if not user:
+    credentials = await authenticate_user(user_data.email, user_data.password)
+    if not credentials:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Get user's approved memberships
-    approved_membership = db.query(OrganizationMember).filter(
-        OrganizationMember.user_id == user.id,
-        OrganizationMember.status == MembershipStatus.APPROVED
-    ).first()
+    # Load the full profile only once the password has checked out
+    user = await get_cached_user(db, credentials.id)
+    
+    # Get all memberships with their organizations in one query
+    rows = (await db.execute(
+        select(OrganizationMember, Organization)
+        .join(Organization, Organization.id == OrganizationMember.organization_id)
+        .where(OrganizationMember.user_id == user.id)
+        .order_by(OrganizationMember.id)
+        .options(*STRICT_LOADING)
+    )).all()
+    
+    # Keep the first membership per status (approved takes precedence)
+    memberships = {}
+    for membership, org in rows:
+        memberships.setdefault(membership.status, (membership, org))
     
     # Check for pending memberships if no approved ones
-    if not approved_membership:
-        pending_membership = db.query(OrganizationMember).filter(
-            OrganizationMember.user_id == user.id,
-            OrganizationMember.status == MembershipStatus.PENDING
-        ).first()
-        
-        if pending_membership:
-            org = db.query(Organization).filter(
-                Organization.id == pending_membership.organization_id
-            ).first()
+    if MembershipStatus.APPROVED not in memberships:
+        if MembershipStatus.PENDING in memberships:
+            pending_membership, org = memberships[MembershipStatus.PENDING]
             
             return {
                 "can_login": False,
@@ -253,15 +380,8 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
             }
         
         # Check for denied memberships
-        denied_membership = db.query(OrganizationMember).filter(
-            OrganizationMember.user_id == user.id,
-            OrganizationMember.status == MembershipStatus.DENIED
-        ).first()
-        
-        if denied_membership:
-            org = db.query(Organization).filter(
-                Organization.id == denied_membership.organization_id
-            ).first()
+        if MembershipStatus.DENIED in memberships:
+            denied_membership, org = memberships[MembershipStatus.DENIED]
             
             return {
                 "can_login": False,
@@ -280,10 +400,7 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
             detail="No organization membership found. Please register with an organization first."
         )
     
-    # Get organization details
-    organization = db.query(Organization).filter(
-        Organization.id == approved_membership.organization_id
-    ).first()
+    approved_membership, organization = memberships[MembershipStatus.APPROVED]
     
     # Create tokens for approved users
     access_token = create_access_token(data={"sub": str(user.id)})
@@ -306,8 +423,8 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
         }
     }
 
-@router.post("/refresh", response_model=dict)
-async def refresh_token(token_data: RefreshTokenRequest, db: Session = Depends(get_db)):
+@router.post("/refresh", response_model=AccessTokenResponse)
+async def refresh_token(token_data: RefreshTokenRequest, db: AsyncSession = Depends(get_async_db)):
     """Refresh access token using refresh token"""
     
     try:
@@ -321,7 +438,7 @@ async def refresh_token(token_data: RefreshTokenRequest, db: Session = Depends(g
             )
         
         # Verify user still exists and is active
-        user = db.query(User).filter(User.id == int(user_id)).first()
+        user = await get_cached_user(db, int(user_id))
         if not user or not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -342,24 +459,26 @@ async def refresh_token(token_data: RefreshTokenRequest, db: Session = Depends(g
             detail="Invalid refresh token"
         )
 
-@router.get("/me")
-async def get_current_user_info(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@router.get("/me", response_model=CurrentUserResponse)
+async def get_current_user_info(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Get current user information"""
     
     # Get user's organizations
-    memberships = db.query(OrganizationMember).filter(
-        OrganizationMember.user_id == current_user.id
-    ).all()
+    memberships = (await db.scalars(
+        select(OrganizationMember)
+        .options(selectinload(OrganizationMember.organization), *STRICT_LOADING)
+        .where(OrganizationMember.user_id == current_user.id)
+    )).all()
     
     organizations = []
     for membership in memberships:
-        org = db.query(Organization).filter(Organization.id == membership.organization_id).first()
+        org = membership.organization
         if org:
             organizations.append({
                 "id": org.id,
                 "name": org.name,
                 "slug": org.slug,
-                "role": membership.role.value
+                "role": membership.role.value if membership.role else None
             })
     
     return {
@@ -378,11 +497,39 @@ async def logout(current_user: User = Depends(get_current_user)):
     return {"message": "Successfully logged out"}
 
 @router.get("/organizations")
-async def get_available_organizations(db: Session = Depends(get_db)):
-    """Get list of organizations available for joining"""
-    organizations = db.query(Organization).filter(Organization.is_public == True).all()
+async def get_available_organizations(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=ORGANIZATIONS_MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get organizations available for joining, ordered by id.
+    
+    Without a limit every organization is returned, as the prebuilt signup page expects.
+    With one, the X-Next-After-Id header carries the after_id for the next page when more may follow.
+    """
+    # The full listing is what the prebuilt signup form loads, so it is served from cache
+    cacheable = after_id is None and limit is None
+    if cacheable:
+        cached = await cache.get_public_organizations()
+        if cached is not None:
+            if cached["next"] is not None:
+                response.headers["X-Next-After-Id"] = str(cached["next"])
+            return cached["items"]
+    
+    query = select(Organization).where(Organization.is_public == True)
+    if after_id is not None:
+        query = query.where(Organization.id > after_id)
+    query = query.order_by(Organization.id)
+    if limit is not None:
+        query = query.limit(limit)
+    organizations = (await db.scalars(query.options(*STRICT_LOADING))).all()
     
-    return [
+    next_after_id = organizations[-1].id if limit is not None and len(organizations) == limit else None
+    if next_after_id is not None:
+        response.headers["X-Next-After-Id"] = str(next_after_id)
+    
+    items = [
         {
             "id": org.id,
             "name": org.name,
@@ -392,33 +539,41 @@ async def get_available_organizations(db: Session = Depends(get_db)):
         }
         for org in organizations
     ]
+    
+    if cacheable:
+        await cache.set_public_organizations({"items": items, "next": next_after_id})
+    
+    return items
 
-@router.get("/pending-memberships")
-async def get_pending_memberships(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@router.get("/pending-memberships", response_model=List[PendingMembershipResponse], response_model_exclude_unset=True)
+async def get_pending_memberships(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Get pending membership requests for organizations where current user is admin"""
     
-    # Get organizations where current user is admin
-    admin_memberships = db.query(OrganizationMember).filter(
+    # Organizations where current user is admin (evaluated as a subquery)
+    admin_org_ids = select(OrganizationMember.organization_id).where(
         OrganizationMember.user_id == current_user.id,
         OrganizationMember.role == UserRole.ADMIN,
         OrganizationMember.status == MembershipStatus.APPROVED
-    ).all()
-    
-    org_ids = [m.organization_id for m in admin_memberships]
-    
-    if not org_ids:
-        return []
+    ).scalar_subquery()
     
     # Get pending membership requests for these organizations
-    pending_requests = db.query(OrganizationMember).filter(
-        OrganizationMember.organization_id.in_(org_ids),
-        OrganizationMember.status == MembershipStatus.PENDING
-    ).all()
+    pending_requests = (await db.scalars(
+        select(OrganizationMember)
+        .options(
+            selectinload(OrganizationMember.user),
+            selectinload(OrganizationMember.organization),
+            *STRICT_LOADING
+        )
+        .where(
+            OrganizationMember.organization_id.in_(admin_org_ids),
+            OrganizationMember.status == MembershipStatus.PENDING
+        )
+    )).all()
     
     results = []
     for request in pending_requests:
-        user = db.query(User).filter(User.id == request.user_id).first()
-        org = db.query(Organization).filter(Organization.id == request.organization_id).first()
+        user = request.user
+        org = request.organization
         
         if user and org:
             results.append({
@@ -435,40 +590,49 @@ async def get_pending_memberships(current_user: User = Depends(get_current_user)
                     "slug": org.slug
                 },
                 "requested_role": request.requested_role.value,
-                "joined_at": request.joined_at.isoformat()
+                "joined_at": request.joined_at
             })
     
     return results
 
-@router.post("/approve-membership")
+@router.post("/approve-membership", response_model=MembershipApprovalResponse, response_model_exclude_unset=True)
 async def approve_membership(
     request: MembershipApprovalRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Approve or deny a membership request"""
     
-    # Get the membership request
-    membership = db.query(OrganizationMember).filter(
-        OrganizationMember.id == request.membership_id,
-        OrganizationMember.status == MembershipStatus.PENDING
-    ).first()
+    # Get the membership request with its user and organization, and whether the
+    # current user is an admin of that organization, in one query
+    admin_membership = aliased(OrganizationMember)
+    is_admin = exists().where(
+        admin_membership.user_id == current_user.id,
+        admin_membership.organization_id == OrganizationMember.organization_id,
+        admin_membership.role == UserRole.ADMIN,
+        admin_membership.status == MembershipStatus.APPROVED
+    )
+    row = (await db.execute(
+        select(OrganizationMember, is_admin.label("is_admin"))
+        .options(
+            joinedload(OrganizationMember.user),
+            joinedload(OrganizationMember.organization),
+            *STRICT_LOADING
+        )
+        .where(
+            OrganizationMember.id == request.membership_id,
+            OrganizationMember.status == MembershipStatus.PENDING
+        )
+    )).first()
     
-    if not membership:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Membership request not found"
         )
     
-    # Check if current user is admin of the organization
-    admin_membership = db.query(OrganizationMember).filter(
-        OrganizationMember.user_id == current_user.id,
-        OrganizationMember.organization_id == membership.organization_id,
-        OrganizationMember.role == UserRole.ADMIN,
-        OrganizationMember.status == MembershipStatus.APPROVED
-    ).first()
-    
-    if not admin_membership:
+    membership = row.OrganizationMember
+    if not row.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have permission to manage this organization"
@@ -478,26 +642,24 @@ async def approve_membership(
         # Validate role if provided
         role_to_assign = membership.requested_role  # Default to requested role
         if request.role:
-            try:
-                role_to_assign = UserRole(request.role.lower())
-            except ValueError:
+            role_to_assign = _ROLE_MAP.get(request.role.lower())
+            if role_to_assign is None:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Invalid role"
                 )
         
         # Approve membership
-        from sqlalchemy.sql import func
         membership.status = MembershipStatus.APPROVED
         membership.role = role_to_assign
         membership.approved_by = current_user.id
         membership.approved_at = func.now()
         
-        db.commit()
+        await db.commit()
+        await cache.invalidate_user_organization(membership.user_id)
         
-        # Get user info for response
-        user = db.query(User).filter(User.id == membership.user_id).first()
-        org = db.query(Organization).filter(Organization.id == membership.organization_id).first()
+        user = membership.user
+        org = membership.organization
         
         return {
             "message": f"Membership approved for {user.full_name}",
@@ -520,11 +682,11 @@ async def approve_membership(
         membership.approved_by = current_user.id
         membership.approved_at = func.now()
         
-        db.commit()
+        await db.commit()
+        await cache.invalidate_user_organization(membership.user_id)
         
-        # Get user info for response
-        user = db.query(User).filter(User.id == membership.user_id).first()
-        org = db.query(Organization).filter(Organization.id == membership.organization_id).first()
+        user = membership.user
+        org = membership.organization
         
         return {
             "message": f"Membership denied for {user.full_name}",
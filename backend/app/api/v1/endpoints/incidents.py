@@ -1,19 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import Row, and_, delete, func, insert, lambda_stmt, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import AsyncIterator, Dict, List, Optional
 from pydantic import BaseModel
 from datetime import datetime
+import orjson
 
-from app.core.database import get_db
+from app.core.database import STRICT_LOADING, AsyncSessionLocal, get_async_db
 from app.core.auth import get_current_user
-from app.models.user import User, OrganizationMember
-from app.models.incident import Incident, IncidentStatus, IncidentSeverity, IncidentUpdate
+from app.core.cache import cache
+from app.core.orgs import get_current_organization
+from app.core.pagination import before_cursor, page_headers
+from app.models.user import User
+from app.models.incident import Incident, IncidentStatus, IncidentSeverity, IncidentUpdate, incident_services
 from app.models.service import Service
 from app.models.organization import Organization
 
 router = APIRouter()
 
+# Number of updates embedded per incident in list-style responses
+RECENT_UPDATES_LIMIT = 5
+
+# List page size limits
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Incidents serialized per chunk of a streamed list response
+STREAM_BATCH_SIZE = 100
+
 # Pydantic models for request/response
 class IncidentCreate(BaseModel):
     title: str
@@ -50,104 +67,161 @@ class IncidentResponse(BaseModel):
     class Config:
         from_attributes = True
 
-def get_user_organization(db: Session, user: User) -> Organization:
-    """Get the user's primary organization"""
-    membership = db.query(OrganizationMember).filter(
-        OrganizationMember.user_id == user.id
-    ).first()
-    
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User is not a member of any organization"
+async def get_recent_updates(db: AsyncSession, incident_ids: List[int]) -> Dict[int, List[Row]]:
+    """Get the latest updates for each incident as plain rows, capped per incident in SQL"""
+    if not incident_ids:
+        return {}
+    
+    ranked = select(
+        IncidentUpdate,
+        func.row_number().over(
+            partition_by=IncidentUpdate.incident_id,
+            order_by=(IncidentUpdate.created_at.desc(), IncidentUpdate.id.desc())
+        ).label("rn")
+    ).where(IncidentUpdate.incident_id.in_(incident_ids)).subquery()
+    
+    updates = (await db.execute(
+        select(
+            ranked.c.id,
+            ranked.c.incident_id,
+            ranked.c.title,
+            ranked.c.message,
+            ranked.c.status,
+            ranked.c.created_at
         )
-    
-    organization = db.query(Organization).filter(
-        Organization.id == membership.organization_id
-    ).first()
-    
-    if not organization:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Organization not found"
-        )
-    
-    return organization
+        .where(ranked.c.rn <= RECENT_UPDATES_LIMIT)
+        .order_by(ranked.c.incident_id, ranked.c.rn)
+    )).all()
+    
+    updates_by_incident = {}
+    for update in updates:
+        updates_by_incident.setdefault(update.incident_id, []).append(update)
+    return updates_by_incident
+
+async def get_affected_services(db: AsyncSession, incident_ids: List[int]) -> Dict[int, List[Row]]:
+    """Get the services linked to each incident as plain rows"""
+    if not incident_ids:
+        return {}
+    
+    links = (await db.execute(
+        select(incident_services.c.incident_id, Service.id, Service.name, Service.status)
+        .join(Service, Service.id == incident_services.c.service_id)
+        .where(incident_services.c.incident_id.in_(incident_ids))
+    )).all()
+    
+    services_by_incident = {}
+    for link in links:
+        services_by_incident.setdefault(link.incident_id, []).append(link)
+    return services_by_incident
+
+def serialize_update(update: IncidentUpdate) -> dict:
+    """Build the response dict for an incident update (datetimes are encoded by orjson)"""
+    return {
+        "id": update.id,
+        "title": update.title,
+        "message": update.message,
+        "status": update.status.value,
+        "created_at": update.created_at
+    }
+
+def serialize_incident(incident: Incident, services: List[Service], updates: List[IncidentUpdate]) -> dict:
+    """Build the IncidentResponse-shaped dict for an incident (ORM objects or plain rows)"""
+    return {
+        "id": incident.id,
+        "title": incident.title,
+        "description": incident.description,
+        "status": incident.status.value,
+        "severity": incident.severity.value,
+        "started_at": incident.started_at,
+        "resolved_at": incident.resolved_at,
+        "created_at": incident.created_at,
+        "updated_at": incident.updated_at,
+        "organization_id": incident.organization_id,
+        "affected_services": [
+            {
+                "id": service.id,
+                "name": service.name,
+                "status": service.status.value
+            } for service in services
+        ],
+        "updates": [serialize_update(update) for update in updates]
+    }
+
+async def stream_incidents(incidents: List[Row]) -> AsyncIterator[bytes]:
+    """Serialize incident rows as a JSON array, loading their services and recent updates one batch at a time.
+    
+    The batches are queried on the generator's own session, since the request's session
+    isn't guaranteed to stay open once the handler has returned the response.
+    """
+    yield b"["
+    async with AsyncSessionLocal() as db:
+        for start in range(0, len(incidents), STREAM_BATCH_SIZE):
+            batch = incidents[start:start + STREAM_BATCH_SIZE]
+            incident_ids = [incident.id for incident in batch]
+            affected_services = await get_affected_services(db, incident_ids)
+            recent_updates = await get_recent_updates(db, incident_ids)
+            for offset, incident in enumerate(batch):
+                chunk = orjson.dumps(serialize_incident(
+                    incident,
+                    affected_services.get(incident.id, []),
+                    recent_updates.get(incident.id, [])
+                ))
+                yield chunk if start + offset == 0 else b"," + chunk
+    yield b"]"
 
 @router.get("/", response_model=List[IncidentResponse])
 async def get_incidents(
     status_filter: Optional[IncidentStatus] = None,
-    limit: int = 50,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    organization: Organization = Depends(get_current_organization),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all incidents for the user's organization"""
-    organization = get_user_organization(db, current_user)
+    """Get a page of incidents for the user's organization, newest first.
     
-    query = db.query(Incident).filter(Incident.organization_id == organization.id)
+    When more may follow, the X-Next-Cursor header carries the cursor for the next page.
+    """
+    
+    # Plain column rows, no ORM objects; built as a lambda statement so each
+    # variant's construct and cache key are reused across requests
+    organization_id = organization.id
+    query = lambda_stmt(lambda: select(Incident.__table__).where(Incident.organization_id == organization_id))
     
     if status_filter:
-        query = query.filter(Incident.status == status_filter)
+        query += lambda s: s.where(Incident.status == status_filter)
+    if cursor is not None:
+        query += lambda s: s.where(before_cursor(Incident, cursor))
+    query += lambda s: s.order_by(Incident.created_at.desc(), Incident.id.desc()).limit(limit)
     
-    incidents = query.order_by(Incident.created_at.desc()).limit(limit).all()
+    incidents = (await db.execute(query)).all()
     
-    result = []
-    for incident in incidents:
-        # Get affected services
-        affected_services = [
-            {
-                "id": service.id,
-                "name": service.name,
-                "status": service.status.value
-            } for service in incident.affected_services
-        ]
-        
-        # Get incident updates
-        updates = [
-            {
-                "id": update.id,
-                "title": update.title,
-                "message": update.message,
-                "status": update.status.value,
-                "created_at": update.created_at.isoformat()
-            } for update in incident.updates[:5]  # Latest 5 updates
-        ]
-        
-        result.append(IncidentResponse(
-            id=incident.id,
-            title=incident.title,
-            description=incident.description,
-            status=incident.status,
-            severity=incident.severity,
-            started_at=incident.started_at.isoformat(),
-            resolved_at=incident.resolved_at.isoformat() if incident.resolved_at else None,
-            created_at=incident.created_at.isoformat(),
-            updated_at=incident.updated_at.isoformat() if incident.updated_at else None,
-            organization_id=incident.organization_id,
-            affected_services=affected_services,
-            updates=updates
-        ))
-    
-    return result
+    return StreamingResponse(
+        stream_incidents(incidents),
+        media_type="application/json",
+        headers=page_headers(incidents, limit)
+    )
 
 @router.post("/", response_model=IncidentResponse)
 async def create_incident(
     incident_data: IncidentCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    organization: Organization = Depends(get_current_organization),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new incident"""
-    organization = get_user_organization(db, current_user)
     
-    # Validate affected services belong to the organization
+    # Validate affected services belong to the organization; the same rows are attached below
+    valid_services = []
     if incident_data.affected_service_ids:
-        valid_services = db.query(Service).filter(
-            and_(
-                Service.id.in_(incident_data.affected_service_ids),
-                Service.organization_id == organization.id,
-                Service.is_active == True
+        valid_services = (await db.scalars(
+            select(Service).where(
+                and_(
+                    Service.id.in_(incident_data.affected_service_ids),
+                    Service.organization_id == organization.id,
+                    Service.is_active == True
+                )
             )
-        ).all()
+        )).all()
         
         if len(valid_services) != len(incident_data.affected_service_ids):
             raise HTTPException(
@@ -155,87 +229,63 @@ async def create_incident(
                 detail="One or more services are invalid or don't belong to your organization"
             )
     
-    # Create new incident
-    new_incident = Incident(
-        title=incident_data.title,
-        description=incident_data.description,
-        status=IncidentStatus.INVESTIGATING,
-        severity=incident_data.severity,
-        organization_id=organization.id,
-        created_by_id=current_user.id
+    # Insert the incident, its service links and the initial update in one transaction
+    incident = await db.scalar(
+        insert(Incident).returning(Incident),
+        [{
+            "title": incident_data.title,
+            "description": incident_data.description,
+            "status": IncidentStatus.INVESTIGATING,
+            "severity": incident_data.severity,
+            "organization_id": organization.id,
+            "created_by_id": current_user.id
+        }]
     )
     
-    db.add(new_incident)
-    db.commit()
-    db.refresh(new_incident)
+    if valid_services:
+        await db.execute(
+            insert(incident_services),
+            [{"incident_id": incident.id, "service_id": service.id} for service in valid_services]
+        )
     
-    # Add affected services
-    if incident_data.affected_service_ids:
-        services = db.query(Service).filter(Service.id.in_(incident_data.affected_service_ids)).all()
-        new_incident.affected_services.extend(services)
-        db.commit()
-    
-    # Create initial incident update
-    initial_update = IncidentUpdate(
-        incident_id=new_incident.id,
-        title="Incident Created",
-        message=f"We are investigating reports of {incident_data.title.lower()}. We will provide updates as we learn more.",
-        status=IncidentStatus.INVESTIGATING
-    )
-    db.add(initial_update)
-    db.commit()
-    
-    # Get the created incident with relationships
-    incident = db.query(Incident).filter(Incident.id == new_incident.id).first()
-    
-    affected_services = [
-        {
-            "id": service.id,
-            "name": service.name,
-            "status": service.status.value
-        } for service in incident.affected_services
-    ]
-    
-    updates = [
-        {
-            "id": initial_update.id,
-            "title": initial_update.title,
-            "message": initial_update.message,
-            "status": initial_update.status.value,
-            "created_at": initial_update.created_at.isoformat()
-        }
-    ]
-    
-    return IncidentResponse(
-        id=incident.id,
-        title=incident.title,
-        description=incident.description,
-        status=incident.status,
-        severity=incident.severity,
-        started_at=incident.started_at.isoformat(),
-        resolved_at=None,
-        created_at=incident.created_at.isoformat(),
-        updated_at=incident.updated_at.isoformat() if incident.updated_at else None,
-        organization_id=incident.organization_id,
-        affected_services=affected_services,
-        updates=updates
+    initial_update = await db.scalar(
+        insert(IncidentUpdate).returning(IncidentUpdate),
+        [{
+            "incident_id": incident.id,
+            "title": "Incident Created",
+            "message": f"We are investigating reports of {incident_data.title.lower()}. We will provide updates as we learn more.",
+            "status": IncidentStatus.INVESTIGATING
+        }]
     )
+    
+    await db.commit()
+    await cache.invalidate_status_page(organization.slug)
+    
+    # The linked services are already loaded, so the response needs no reload
+    set_committed_value(incident, "affected_services", list(valid_services))
+    
+    return ORJSONResponse(serialize_incident(incident, incident.affected_services, [initial_update]))
 
 @router.get("/{incident_id}", response_model=IncidentResponse)
 async def get_incident(
     incident_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    organization: Organization = Depends(get_current_organization),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific incident"""
-    organization = get_user_organization(db, current_user)
     
-    incident = db.query(Incident).filter(
-        and_(
-            Incident.id == incident_id,
-            Incident.organization_id == organization.id
+    incident = await db.scalar(
+        select(Incident).options(
+            selectinload(Incident.affected_services),
+            selectinload(Incident.updates),
+            *STRICT_LOADING
+        ).where(
+            and_(
+                Incident.id == incident_id,
+                Incident.organization_id == organization.id
+            )
         )
-    ).first()
+    )
     
     if not incident:
         raise HTTPException(
@@ -243,143 +293,118 @@ async def get_incident(
             detail="Incident not found"
         )
     
-    affected_services = [
-        {
-            "id": service.id,
-            "name": service.name,
-            "status": service.status.value
-        } for service in incident.affected_services
-    ]
-    
-    updates = [
-        {
-            "id": update.id,
-            "title": update.title,
-            "message": update.message,
-            "status": update.status.value,
-            "created_at": update.created_at.isoformat()
-        } for update in incident.updates
-    ]
-    
-    return IncidentResponse(
-        id=incident.id,
-        title=incident.title,
-        description=incident.description,
-        status=incident.status,
-        severity=incident.severity,
-        started_at=incident.started_at.isoformat(),
-        resolved_at=incident.resolved_at.isoformat() if incident.resolved_at else None,
-        created_at=incident.created_at.isoformat(),
-        updated_at=incident.updated_at.isoformat() if incident.updated_at else None,
-        organization_id=incident.organization_id,
-        affected_services=affected_services,
-        updates=updates
-    )
+    return ORJSONResponse(serialize_incident(incident, incident.affected_services, incident.updates))
 
 @router.put("/{incident_id}", response_model=IncidentResponse)
 async def update_incident(
     incident_id: int,
     incident_data: IncidentUpdateRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    organization: Organization = Depends(get_current_organization),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update an incident"""
-    organization = get_user_organization(db, current_user)
-    
-    incident = db.query(Incident).filter(
-        and_(
-            Incident.id == incident_id,
-            Incident.organization_id == organization.id
-        )
-    ).first()
-    
-    if not incident:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Incident not found"
-        )
-    
-    # Update incident fields
     update_data = incident_data.dict(exclude_unset=True)
     affected_service_ids = update_data.pop('affected_service_ids', None)
     
-    for field, value in update_data.items():
-        setattr(incident, field, value)
-    
-    # Handle resolved status
-    if incident_data.status == IncidentStatus.RESOLVED and not incident.resolved_at:
-        incident.resolved_at = datetime.utcnow()
-    elif incident_data.status != IncidentStatus.RESOLVED and incident.resolved_at:
-        incident.resolved_at = None
-    
-    # Update affected services if provided
-    if affected_service_ids is not None:
-        # Clear existing associations
-        incident.affected_services.clear()
+    if affected_service_ids is None:
+        # No service reassignment: update the row in place without loading it first
+        if incident_data.status == IncidentStatus.RESOLVED:
+            update_data["resolved_at"] = func.coalesce(Incident.resolved_at, datetime.utcnow())
+        else:
+            update_data["resolved_at"] = None
         
-        # Add new services
-        if affected_service_ids:
-            services = db.query(Service).filter(
+        result = await db.execute(
+            update(Incident)
+            .where(
                 and_(
-                    Service.id.in_(affected_service_ids),
-                    Service.organization_id == organization.id,
-                    Service.is_active == True
+                    Incident.id == incident_id,
+                    Incident.organization_id == organization.id
+                )
+            )
+            .values(**update_data)
+            .execution_options(synchronize_session=False)
+        )
+        
+        if result.rowcount == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Incident not found"
+            )
+    else:
+        incident = await db.scalar(
+            select(Incident).options(
+                selectinload(Incident.affected_services),
+                *STRICT_LOADING
+            ).where(
+                and_(
+                    Incident.id == incident_id,
+                    Incident.organization_id == organization.id
                 )
-            ).all()
+            )
+        )
+        
+        if not incident:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Incident not found"
+            )
+        
+        for field, value in update_data.items():
+            setattr(incident, field, value)
+        
+        # Handle resolved status
+        if incident_data.status == IncidentStatus.RESOLVED and not incident.resolved_at:
+            incident.resolved_at = datetime.utcnow()
+        elif incident_data.status != IncidentStatus.RESOLVED and incident.resolved_at:
+            incident.resolved_at = None
+        
+        # Replace affected services
+        incident.affected_services.clear()
+        if affected_service_ids:
+            services = (await db.scalars(
+                select(Service).where(
+                    and_(
+                        Service.id.in_(affected_service_ids),
+                        Service.organization_id == organization.id,
+                        Service.is_active == True
+                    )
+                )
+            )).all()
             incident.affected_services.extend(services)
     
-    db.commit()
-    db.refresh(incident)
-    
-    affected_services = [
-        {
-            "id": service.id,
-            "name": service.name,
-            "status": service.status.value
-        } for service in incident.affected_services
-    ]
-    
-    updates = [
-        {
-            "id": update.id,
-            "title": update.title,
-            "message": update.message,
-            "status": update.status.value,
-            "created_at": update.created_at.isoformat()
-        } for update in incident.updates[:5]
-    ]
-    
-    return IncidentResponse(
-        id=incident.id,
-        title=incident.title,
-        description=incident.description,
-        status=incident.status,
-        severity=incident.severity,
-        started_at=incident.started_at.isoformat(),
-        resolved_at=incident.resolved_at.isoformat() if incident.resolved_at else None,
-        created_at=incident.created_at.isoformat(),
-        updated_at=incident.updated_at.isoformat() if incident.updated_at else None,
-        organization_id=incident.organization_id,
-        affected_services=affected_services,
-        updates=updates
+    await db.commit()
+    await cache.invalidate_status_page(organization.slug)
+    
+    # Reload with affected services eagerly loaded (and server-generated timestamps) for the response
+    incident = await db.scalar(
+        select(Incident)
+        .options(selectinload(Incident.affected_services), *STRICT_LOADING)
+        .where(Incident.id == incident_id)
+        .execution_options(populate_existing=True)
     )
+    recent_updates = await get_recent_updates(db, [incident.id])
+    
+    return ORJSONResponse(serialize_incident(
+        incident, incident.affected_services, recent_updates.get(incident.id, [])
+    ))
 
 @router.post("/{incident_id}/updates")
 async def add_incident_update(
     incident_id: int,
     update_data: IncidentStatusUpdateRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    organization: Organization = Depends(get_current_organization),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add an update to an incident"""
-    organization = get_user_organization(db, current_user)
     
-    incident = db.query(Incident).filter(
-        and_(
-            Incident.id == incident_id,
-            Incident.organization_id == organization.id
+    incident = await db.scalar(
+        select(Incident).where(
+            and_(
+                Incident.id == incident_id,
+                Incident.organization_id == organization.id
+            )
         )
-    ).first()
+    )
     
     if not incident:
         raise HTTPException(
@@ -405,33 +430,40 @@ async def add_incident_update(
     )
     
     db.add(incident_update)
-    db.commit()
-    db.refresh(incident_update)
+    await db.commit()
+    await cache.invalidate_status_page(organization.slug)
+    await db.refresh(incident_update)
     
     return {
         "id": incident_update.id,
         "title": incident_update.title,
         "message": incident_update.message,
         "status": incident_update.status.value,
-        "created_at": incident_update.created_at.isoformat(),
+        "created_at": incident_update.created_at,
         "incident_status": incident.status.value
     }
 
 @router.get("/{incident_id}/updates")
 async def get_incident_updates(
     incident_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    organization: Organization = Depends(get_current_organization),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all updates for an incident"""
-    organization = get_user_organization(db, current_user)
+    """Get a page of updates for an incident, newest first.
     
-    incident = db.query(Incident).filter(
-        and_(
-            Incident.id == incident_id,
-            Incident.organization_id == organization.id
+    When more may follow, the X-Next-Cursor header carries the cursor for the next page.
+    """
+    
+    incident = await db.scalar(
+        select(Incident.id).where(
+            and_(
+                Incident.id == incident_id,
+                Incident.organization_id == organization.id
+            )
         )
-    ).first()
+    )
     
     if not incident:
         raise HTTPException(
@@ -439,56 +471,63 @@ async def get_incident_updates(
             detail="Incident not found"
         )
     
-    updates = db.query(IncidentUpdate).filter(
-        IncidentUpdate.incident_id == incident_id
-    ).order_by(IncidentUpdate.created_at.desc()).all()
-    
-    return [
-        {
-            "id": update.id,
-            "title": update.title,
-            "message": update.message,
-            "status": update.status.value,
-            "created_at": update.created_at.isoformat()
-        } for update in updates
-    ]
+    query = select(IncidentUpdate).where(IncidentUpdate.incident_id == incident_id)
+    if cursor is not None:
+        query = query.where(before_cursor(IncidentUpdate, cursor))
+    
+    updates = (await db.scalars(
+        query.order_by(IncidentUpdate.created_at.desc(), IncidentUpdate.id.desc()).limit(limit)
+    )).all()
+    
+    return ORJSONResponse(
+        [serialize_update(update) for update in updates],
+        headers=page_headers(updates, limit)
+    )
 
 @router.delete("/{incident_id}")
 async def delete_incident(
     incident_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    organization: Organization = Depends(get_current_organization),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete an incident (only if not resolved)"""
-    organization = get_user_organization(db, current_user)
     
-    incident = db.query(Incident).filter(
-        and_(
-            Incident.id == incident_id,
-            Incident.organization_id == organization.id
+    # Updates and service links go with it through ON DELETE CASCADE
+    title = await db.scalar(
+        delete(Incident)
+        .where(
+            and_(
+                Incident.id == incident_id,
+                Incident.organization_id == organization.id,
+                Incident.status != IncidentStatus.RESOLVED
+            )
         )
-    ).first()
+        .returning(Incident.title)
+        .execution_options(synchronize_session=False)
+    )
     
-    if not incident:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Incident not found"
+    if title is None:
+        incident_status = await db.scalar(
+            select(Incident.status).where(
+                and_(
+                    Incident.id == incident_id,
+                    Incident.organization_id == organization.id
+                )
+            )
         )
-    
-    if incident.status == IncidentStatus.RESOLVED:
+        
+        if incident_status is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Incident not found"
+            )
+        
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete resolved incidents"
         )
     
-    # Delete incident updates first
-    db.query(IncidentUpdate).filter(IncidentUpdate.incident_id == incident_id).delete()
-    
-    # Clear affected services
-    incident.affected_services.clear()
-    
-    # Delete incident
-    db.delete(incident)
-    db.commit()
+    await db.commit()
+    await cache.invalidate_status_page(organization.slug)
     
-    return {"message": f"Incident '{incident.title}' has been deleted"} 
\ No newline at end of file
+    return {"message": f"Incident '{title}' has been deleted"}
@@ -1,42 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import and_, case, extract, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict
 from pydantic import BaseModel
+import numpy as np
+import orjson
 
-from app.core.database import get_db
-from app.core.auth import get_current_user
-from app.models.user import User, OrganizationMember
+from app.core.cache import cache
+from app.core.database import get_async_db
+from app.core.orgs import get_current_organization
 from app.models.service import Service, ServiceStatus, ServiceStatusHistory
 from app.models.organization import Organization
 
 router = APIRouter()
 
-def get_user_organization(db: Session, user: User) -> Organization:
-    """Get the user's primary organization"""
-    membership = db.query(OrganizationMember).filter(
-        OrganizationMember.user_id == user.id
-    ).first()
-    
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User is not a member of any organization"
-        )
-    
-    organization = db.query(Organization).filter(
-        Organization.id == membership.organization_id
-    ).first()
-    
-    if not organization:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Organization not found"
-        )
-    
-    return organization
-
 class UptimeDataPoint(BaseModel):
     timestamp: str
     uptime_percentage: float
@@ -54,101 +32,151 @@ class UptimeMetricsResponse(BaseModel):
     period_type: str
     period_label: str
 
-def calculate_service_uptime_for_period(
-    service: Service, 
-    db: Session, 
-    start_time: datetime, 
-    end_time: datetime
-) -> float:
-    """Calculate uptime percentage for a service in a specific time period"""
-    if not service.is_active:
-        return 100.0
+# Columns of the per-period aggregates returned by get_uptime_buckets
+BUCKET_COUNT, BUCKET_FIRST, BUCKET_LAST, BUCKET_OPERATIONAL_BETWEEN, BUCKET_LAST_OPERATIONAL = range(5)
+
+async def get_uptime_buckets(
+    db: AsyncSession,
+    services: List[Service],
+    window_start: datetime,
+    period_length: timedelta,
+    periods: int
+) -> Dict[int, np.ndarray]:
+    """Aggregate status history per service and period in a single GROUP BY query.
     
-    # Get status history for the period
-    history = db.query(ServiceStatusHistory).filter(
+    Returns an array per service with one row per period (plus a final row for entries
+    landing exactly on the window end) holding: entry count, first and last entry time
+    (epoch seconds), operational seconds between consecutive entries, and whether the
+    last entry is operational.
+    """
+    start_epoch = window_start.timestamp()
+    length = period_length.total_seconds()
+    created_epoch = extract("epoch", ServiceStatusHistory.created_at)
+    
+    entries = select(
+        ServiceStatusHistory.id,
+        ServiceStatusHistory.service_id,
+        created_epoch.label("at"),
+        func.floor((created_epoch - start_epoch) / length).label("bucket"),
+        case((ServiceStatusHistory.status == ServiceStatus.OPERATIONAL, 1), else_=0).label("operational")
+    ).where(
         and_(
-            ServiceStatusHistory.service_id == service.id,
-            ServiceStatusHistory.created_at >= start_time,
-            ServiceStatusHistory.created_at <= end_time
+            ServiceStatusHistory.service_id.in_([service.id for service in services]),
+            ServiceStatusHistory.created_at >= window_start,
+            ServiceStatusHistory.created_at <= window_start + period_length * periods
         )
-    ).order_by(ServiceStatusHistory.created_at).all()
-    
-    total_duration = (end_time - start_time).total_seconds()
-    if total_duration <= 0:
-        return 100.0
-    
-    operational_duration = 0
-    
-    # If no history in this period, check service's current status and last change
-    if not history:
-        # If the service's last status change was before our time period,
-        # then the service has been in its current status for the entire period
-        if service.last_status_change <= start_time:
-            # Service has been in current status for entire period
-            if service.status == ServiceStatus.OPERATIONAL:
-                operational_duration = total_duration
-            else:
-                operational_duration = 0
-        else:
-            # Service changed status during our period, calculate accordingly
-            if service.last_status_change <= end_time:
-                # Change happened within our period
-                time_before_change = (service.last_status_change - start_time).total_seconds()
-                time_after_change = (end_time - service.last_status_change).total_seconds()
-                
-                # Assume it was operational before the change (since we have no history)
-                operational_duration = max(0, time_before_change)
-                
-                # Add time after change if service is now operational
-                if service.status == ServiceStatus.OPERATIONAL:
-                    operational_duration += max(0, time_after_change)
-            else:
-                # Change happened after our period, assume operational for entire period
-                operational_duration = total_duration
-        
-        return min((operational_duration / total_duration) * 100, 100.0)
+    ).subquery()
     
-    # If we have history, use the original logic with better initial status detection
-    current_status = ServiceStatus.OPERATIONAL  # Default assumption
+    period = (entries.c.service_id, entries.c.bucket)
+    segments = select(
+        entries.c.service_id,
+        entries.c.bucket,
+        entries.c.at,
+        entries.c.operational,
+        func.lead(entries.c.at).over(
+            partition_by=period, order_by=(entries.c.at, entries.c.id)
+        ).label("next_at"),
+        func.row_number().over(
+            partition_by=period, order_by=(entries.c.at.desc(), entries.c.id.desc())
+        ).label("from_last")
+    ).subquery()
     
-    # Try to determine the initial status more accurately
-    if service.last_status_change <= start_time:
-        # Service was already in current status at start of period
-        current_status = service.status
+    rows = (await db.execute(
+        select(
+            segments.c.service_id,
+            segments.c.bucket,
+            func.count(),
+            func.min(segments.c.at),
+            func.max(segments.c.at),
+            func.sum(case(
+                (and_(segments.c.operational == 1, segments.c.next_at.is_not(None)), segments.c.next_at - segments.c.at),
+                else_=0
+            )),
+            func.max(case((segments.c.from_last == 1, segments.c.operational), else_=0))
+        ).group_by(segments.c.service_id, segments.c.bucket)
+    )).all()
     
-    last_change = start_time
+    buckets = {service.id: np.zeros((periods + 1, 5)) for service in services}
+    for service_id, bucket, *aggregates in rows:
+        buckets[service_id][int(bucket)] = [float(value) for value in aggregates]
+    return buckets
+
+def calculate_service_uptimes(
+    service: Service,
+    buckets: np.ndarray,
+    period_starts: List[datetime],
+    period_length: timedelta
+) -> np.ndarray:
+    """Calculate uptime percentages for a service over consecutive periods from its per-period aggregates.
     
-    # Process status changes
-    for entry in history:
-        # Add time in previous status
-        if current_status == ServiceStatus.OPERATIONAL:
-            operational_duration += (entry.created_at - last_change).total_seconds()
-        
-        current_status = entry.status
-        last_change = entry.created_at
+    Each period is evaluated on its own: entries on either bound count towards the
+    period, a period with no entries falls back to the service's last status change,
+    and a period with entries starts in the service's current status if that change
+    predates it (operational otherwise).
+    """
+    if not service.is_active:
+        return np.full(len(period_starts), 100.0)
     
-    # Add remaining time in current status
-    if current_status == ServiceStatus.OPERATIONAL:
-        operational_duration += (end_time - last_change).total_seconds()
+    total_duration = period_length.total_seconds()
+    starts = np.array([start.timestamp() for start in period_starts])
+    ends = starts + total_duration
+    last_change = service.last_status_change.timestamp()
+    currently_operational = service.status == ServiceStatus.OPERATIONAL
+    
+    # Periods without history: in the current status since the last change,
+    # assumed operational before it
+    no_history_duration = np.where(
+        last_change <= starts,
+        total_duration if currently_operational else 0.0,
+        np.where(
+            last_change <= ends,
+            np.maximum(0, last_change - starts) + (np.maximum(0, ends - last_change) if currently_operational else 0.0),
+            total_duration
+        )
+    )
     
-    return min((operational_duration / total_duration) * 100, 100.0)
+    current, following = buckets[:-1], buckets[1:]
+    has_entries = current[:, BUCKET_COUNT] > 0
+    # An entry exactly on a period's end also belongs to that period
+    has_boundary_entry = (following[:, BUCKET_COUNT] > 0) & (following[:, BUCKET_FIRST] == ends)
+    
+    # Lead-in before the first entry, time between entries, and the tail after the last one
+    initially_operational = np.where(last_change <= starts, currently_operational, True)
+    history_duration = np.where(
+        has_entries,
+        initially_operational * (current[:, BUCKET_FIRST] - starts)
+        + current[:, BUCKET_OPERATIONAL_BETWEEN]
+        + current[:, BUCKET_LAST_OPERATIONAL] * (ends - current[:, BUCKET_LAST]),
+        initially_operational * total_duration
+    )
+    
+    operational_duration = np.where(has_entries | has_boundary_entry, history_duration, no_history_duration)
+    return np.minimum(operational_duration / total_duration * 100, 100.0)
 
 @router.get("/uptime/{period_type}", response_model=UptimeMetricsResponse)
 async def get_uptime_metrics(
     period_type: str,  # "daily" or "hourly"
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    organization: Organization = Depends(get_current_organization),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get uptime metrics for the specified period type"""
-    organization = get_user_organization(db, current_user)
+    """Get uptime metrics for the specified period type.
+    
+    Responses are the same for everyone in the organization, so they are cached per
+    (organization, period type) until the TTL runs out or a service changes.
+    """
+    cached = await cache.get_uptime_metrics(organization.id, period_type)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
     
     # Get all active services for the organization
-    services = db.query(Service).filter(
-        and_(
-            Service.organization_id == organization.id,
-            Service.is_active == True
+    services = (await db.scalars(
+        select(Service).where(
+            and_(
+                Service.organization_id == organization.id,
+                Service.is_active == True
+            )
         )
-    ).all()
+    )).all()
     
     if not services:
         return UptimeMetricsResponse(
@@ -166,64 +194,68 @@ async def get_uptime_metrics(
         periods = 30
         period_label = "Last 30 days"
         
+        # Aggregate the whole window per day in the database, then compute every day at once per service
+        period_length = timedelta(days=1)
+        period_starts = [
+            (now - timedelta(days=periods - i)).replace(hour=0, minute=0, second=0, microsecond=0)
+            for i in range(periods)
+        ]
+        buckets_by_service = await get_uptime_buckets(db, services, period_starts[0], period_length, periods)
+        
         for service in services:
-            data_points = []
-            service_total_uptime = 0
-            
-            for i in range(periods):
-                day_start = (now - timedelta(days=i+1)).replace(hour=0, minute=0, second=0, microsecond=0)
-                day_end = day_start + timedelta(days=1)
-                
-                uptime = calculate_service_uptime_for_period(service, db, day_start, day_end)
-                service_total_uptime += uptime
-                
-                data_points.append(UptimeDataPoint(
-                    timestamp=day_start.isoformat(),
-                    uptime_percentage=round(uptime, 2),
-                    label=day_start.strftime("%b %d")
-                ))
+            uptimes = calculate_service_uptimes(
+                service, buckets_by_service[service.id], period_starts, period_length
+            )
             
-            # Reverse to show chronologically
-            data_points.reverse()
+            data_points = [
+                {
+                    "timestamp": day_start,
+                    "uptime_percentage": round(float(uptime), 2),
+                    "label": day_start.strftime("%b %d")
+                }
+                for day_start, uptime in zip(period_starts, uptimes)
+            ]
             
-            service_uptime_data.append(ServiceUptimeData(
-                service_id=service.id,
-                service_name=service.name,
-                data_points=data_points,
-                overall_uptime=round(service_total_uptime / periods, 2)
-            ))
+            service_uptime_data.append({
+                "service_id": service.id,
+                "service_name": service.name,
+                "data_points": data_points,
+                "overall_uptime": round(float(uptimes.sum()) / periods, 2)
+            })
     
     elif period_type == "hourly":
         # Last 24 hours, hourly data points
         periods = 24
         period_label = "Last 24 hours"
         
+        # Aggregate the whole window per hour in the database, then compute every hour at once per service
+        period_length = timedelta(hours=1)
+        period_starts = [
+            (now - timedelta(hours=periods - i)).replace(minute=0, second=0, microsecond=0)
+            for i in range(periods)
+        ]
+        buckets_by_service = await get_uptime_buckets(db, services, period_starts[0], period_length, periods)
+        
         for service in services:
-            data_points = []
-            service_total_uptime = 0
-            
-            for i in range(periods):
-                hour_start = (now - timedelta(hours=i+1)).replace(minute=0, second=0, microsecond=0)
-                hour_end = hour_start + timedelta(hours=1)
-                
-                uptime = calculate_service_uptime_for_period(service, db, hour_start, hour_end)
-                service_total_uptime += uptime
-                
-                data_points.append(UptimeDataPoint(
-                    timestamp=hour_start.isoformat(),
-                    uptime_percentage=round(uptime, 2),
-                    label=hour_start.strftime("%H:%M")
-                ))
+            uptimes = calculate_service_uptimes(
+                service, buckets_by_service[service.id], period_starts, period_length
+            )
             
-            # Reverse to show chronologically
-            data_points.reverse()
+            data_points = [
+                {
+                    "timestamp": hour_start,
+                    "uptime_percentage": round(float(uptime), 2),
+                    "label": hour_start.strftime("%H:%M")
+                }
+                for hour_start, uptime in zip(period_starts, uptimes)
+            ]
             
-            service_uptime_data.append(ServiceUptimeData(
-                service_id=service.id,
-                service_name=service.name,
-                data_points=data_points,
-                overall_uptime=round(service_total_uptime / periods, 2)
-            ))
+            service_uptime_data.append({
+                "service_id": service.id,
+                "service_name": service.name,
+                "data_points": data_points,
+                "overall_uptime": round(float(uptimes.sum()) / periods, 2)
+            })
     
     else:
         raise HTTPException(
@@ -233,13 +265,17 @@ async def get_uptime_metrics(
     
     # Calculate overall uptime across all services
     if service_uptime_data:
-        overall_uptime = sum(s.overall_uptime for s in service_uptime_data) / len(service_uptime_data)
+        overall_uptime = sum(s["overall_uptime"] for s in service_uptime_data) / len(service_uptime_data)
     else:
         overall_uptime = 100.0
     
-    return UptimeMetricsResponse(
-        services=service_uptime_data,
-        overall_uptime=round(overall_uptime, 2),
-        period_type=period_type,
-        period_label=period_label
-    ) 
\ No newline at end of file
+    # Plain dicts serialized directly; the models above only document the response shape
+    body = orjson.dumps({
+        "services": service_uptime_data,
+        "overall_uptime": round(overall_uptime, 2),
+        "period_type": period_type,
+        "period_label": period_label
+    })
+    await cache.set_uptime_metrics(organization.id, period_type, body)
+    
+    return Response(content=body, media_type="application/json") 
\ No newline at end of file
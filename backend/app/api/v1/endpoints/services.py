@@ -1,18 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 
-from app.core.database import get_db
+from app.core.cache import cache
+from app.core.database import get_async_db
 from app.core.auth import get_current_user
-from app.models.user import User, OrganizationMember
+from app.core.orgs import get_current_organization
+from app.core.pagination import before_cursor, page_headers
+from app.models.user import User
 from app.models.service import Service, ServiceStatus, ServiceStatusHistory
 from app.models.organization import Organization
 
 router = APIRouter()
 
+# Status history page size limits
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
 # Pydantic models for request/response
 class ServiceCreate(BaseModel):
     name: str
@@ -43,85 +51,64 @@ class ServiceResponse(BaseModel):
     monitoring_enabled: bool
     monitoring_url: Optional[str]
     organization_id: int
-    created_at: str
-    updated_at: Optional[str]
-    last_status_change: str
+    created_at: datetime
+    updated_at: Optional[datetime]
+    last_status_change: datetime
 
     class Config:
         from_attributes = True
 
-def get_user_organization(db: Session, user: User) -> Organization:
-    """Get the user's primary organization"""
-    membership = db.query(OrganizationMember).filter(
-        OrganizationMember.user_id == user.id
-    ).first()
-    
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User is not a member of any organization"
-        )
+async def get_organization_service(db: AsyncSession, organization: Organization, service_id: int) -> Service:
+    """Get an active service of the organization, or raise 404.
     
-    organization = db.query(Organization).filter(
-        Organization.id == membership.organization_id
-    ).first()
+    Looked up by primary key alone (answered from the session if already loaded)
+    and authorized in Python rather than with extra predicates in SQL.
+    """
+    service = await db.get(Service, service_id)
     
-    if not organization:
+    if not service or service.organization_id != organization.id or not service.is_active:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Organization not found"
+            detail="Service not found"
         )
     
-    return organization
+    return service
 
 @router.get("/", response_model=List[ServiceResponse])
 async def get_services(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    organization: Organization = Depends(get_current_organization),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all services for the user's organization"""
-    organization = get_user_organization(db, current_user)
-    
-    services = db.query(Service).filter(
-        and_(
-            Service.organization_id == organization.id,
-            Service.is_active == True
-        )
-    ).order_by(Service.sort_order, Service.name).all()
-    
-    return [
-        ServiceResponse(
-            id=service.id,
-            name=service.name,
-            description=service.description,
-            status=service.status,
-            is_active=service.is_active,
-            monitoring_enabled=service.monitoring_enabled,
-            monitoring_url=service.monitoring_url,
-            organization_id=service.organization_id,
-            created_at=service.created_at.isoformat() if service.created_at else "",
-            updated_at=service.updated_at.isoformat() if service.updated_at else None,
-            last_status_change=service.last_status_change.isoformat() if service.last_status_change else ""
-        ) for service in services
-    ]
+    # Only the columns the response returns; monitoring_interval, created_by_id etc. stay in the database
+    services = (await db.execute(
+        select(*(getattr(Service, field) for field in ServiceResponse.model_fields)).where(
+            and_(
+                Service.organization_id == organization.id,
+                Service.is_active == True
+            )
+        ).order_by(Service.sort_order, Service.name)
+    )).all()
+    
+    # Converted to ServiceResponse by the response model
+    return services
 
 @router.post("/", response_model=ServiceResponse)
 async def create_service(
     service_data: ServiceCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    organization: Organization = Depends(get_current_organization),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new service"""
-    organization = get_user_organization(db, current_user)
-    
     # Check if service name already exists in organization
-    existing_service = db.query(Service).filter(
+    existing_service = await db.scalar(select(Service).where(
         and_(
             Service.organization_id == organization.id,
             Service.name == service_data.name,
             Service.is_active == True
         )
-    ).first()
+    ))
     
     if existing_service:
         raise HTTPException(
@@ -141,94 +128,42 @@ async def create_service(
         created_by_id=current_user.id
     )
     
-    db.add(new_service)
-    db.commit()
-    db.refresh(new_service)
-    
-    # Create initial status history entry
+    # Create initial status history entry; linking it through the relationship lets
+    # both rows be inserted in one flush and committed together
     status_history = ServiceStatusHistory(
-        service_id=new_service.id,
+        service=new_service,
         status=ServiceStatus.OPERATIONAL,
         reason="Service created",
         automated=False
     )
-    db.add(status_history)
-    db.commit()
+    db.add_all([new_service, status_history])
+    await db.commit()
+    await db.refresh(new_service)
+    await cache.invalidate_uptime_metrics(organization.id)
+    await cache.invalidate_status_page(organization.slug)
     
-    return ServiceResponse(
-        id=new_service.id,
-        name=new_service.name,
-        description=new_service.description,
-        status=new_service.status,
-        is_active=new_service.is_active,
-        monitoring_enabled=new_service.monitoring_enabled,
-        monitoring_url=new_service.monitoring_url,
-        organization_id=new_service.organization_id,
-        created_at=new_service.created_at.isoformat(),
-        updated_at=new_service.updated_at.isoformat() if new_service.updated_at else None,
-        last_status_change=new_service.last_status_change.isoformat()
-    )
+    return new_service
 
 @router.get("/{service_id}", response_model=ServiceResponse)
 async def get_service(
     service_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    organization: Organization = Depends(get_current_organization),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific service"""
-    organization = get_user_organization(db, current_user)
+    service = await get_organization_service(db, organization, service_id)
     
-    service = db.query(Service).filter(
-        and_(
-            Service.id == service_id,
-            Service.organization_id == organization.id,
-            Service.is_active == True
-        )
-    ).first()
-    
-    if not service:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Service not found"
-        )
-    
-    return ServiceResponse(
-        id=service.id,
-        name=service.name,
-        description=service.description,
-        status=service.status,
-        is_active=service.is_active,
-        monitoring_enabled=service.monitoring_enabled,
-        monitoring_url=service.monitoring_url,
-        organization_id=service.organization_id,
-        created_at=service.created_at.isoformat(),
-        updated_at=service.updated_at.isoformat() if service.updated_at else None,
-        last_status_change=service.last_status_change.isoformat()
-    )
+    return service
 
 @router.put("/{service_id}", response_model=ServiceResponse)
 async def update_service(
     service_id: int,
     service_data: ServiceUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    organization: Organization = Depends(get_current_organization),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a service"""
-    organization = get_user_organization(db, current_user)
-    
-    service = db.query(Service).filter(
-        and_(
-            Service.id == service_id,
-            Service.organization_id == organization.id,
-            Service.is_active == True
-        )
-    ).first()
-    
-    if not service:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Service not found"
-        )
+    service = await get_organization_service(db, organization, service_id)
     
     # Store previous status for history
     previous_status = service.status
@@ -240,7 +175,7 @@ async def update_service(
     
     # If status changed, update last_status_change and create history entry
     if service_data.status and service_data.status != previous_status:
-        service.last_status_change = db.execute("SELECT CURRENT_TIMESTAMP").scalar()
+        service.last_status_change = datetime.utcnow()
         
         status_history = ServiceStatusHistory(
             service_id=service.id,
@@ -251,46 +186,22 @@ async def update_service(
         )
         db.add(status_history)
     
-    db.commit()
-    db.refresh(service)
+    await db.commit()
+    await db.refresh(service)
+    await cache.invalidate_uptime_metrics(organization.id)
+    await cache.invalidate_status_page(organization.slug)
     
-    return ServiceResponse(
-        id=service.id,
-        name=service.name,
-        description=service.description,
-        status=service.status,
-        is_active=service.is_active,
-        monitoring_enabled=service.monitoring_enabled,
-        monitoring_url=service.monitoring_url,
-        organization_id=service.organization_id,
-        created_at=service.created_at.isoformat(),
-        updated_at=service.updated_at.isoformat() if service.updated_at else None,
-        last_status_change=service.last_status_change.isoformat()
-    )
+    return service
 
 @router.patch("/{service_id}/status", response_model=ServiceResponse)
 async def update_service_status(
     service_id: int,
     status_data: ServiceStatusUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    organization: Organization = Depends(get_current_organization),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update only the status of a service"""
-    organization = get_user_organization(db, current_user)
-    
-    service = db.query(Service).filter(
-        and_(
-            Service.id == service_id,
-            Service.organization_id == organization.id,
-            Service.is_active == True
-        )
-    ).first()
-    
-    if not service:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Service not found"
-        )
+    service = await get_organization_service(db, organization, service_id)
     
     # Store previous status
     previous_status = service.status
@@ -309,90 +220,63 @@ async def update_service_status(
     )
     db.add(status_history)
     
-    db.commit()
-    db.refresh(service)
+    await db.commit()
+    await db.refresh(service)
+    await cache.invalidate_uptime_metrics(organization.id)
+    await cache.invalidate_status_page(organization.slug)
     
     # TODO: Send WebSocket notification for real-time updates
     # await websocket_manager.notify_status_change(service.id, service.status.value, organization.id)
     
-    return ServiceResponse(
-        id=service.id,
-        name=service.name,
-        description=service.description,
-        status=service.status,
-        is_active=service.is_active,
-        monitoring_enabled=service.monitoring_enabled,
-        monitoring_url=service.monitoring_url,
-        organization_id=service.organization_id,
-        created_at=service.created_at.isoformat(),
-        updated_at=service.updated_at.isoformat() if service.updated_at else None,
-        last_status_change=service.last_status_change.isoformat()
-    )
+    return service
 
 @router.delete("/{service_id}")
 async def delete_service(
     service_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    organization: Organization = Depends(get_current_organization),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Soft delete a service (mark as inactive)"""
-    organization = get_user_organization(db, current_user)
-    
-    service = db.query(Service).filter(
-        and_(
-            Service.id == service_id,
-            Service.organization_id == organization.id,
-            Service.is_active == True
-        )
-    ).first()
-    
-    if not service:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Service not found"
-        )
+    service = await get_organization_service(db, organization, service_id)
     
     # Soft delete (mark as inactive)
     service.is_active = False
-    db.commit()
+    await db.commit()
+    await cache.invalidate_uptime_metrics(organization.id)
+    await cache.invalidate_status_page(organization.slug)
     
     return {"message": f"Service '{service.name}' has been deleted"}
 
 @router.get("/{service_id}/history")
 async def get_service_status_history(
     service_id: int,
-    limit: int = 50,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    organization: Organization = Depends(get_current_organization),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get status history for a service"""
-    organization = get_user_organization(db, current_user)
+    """Get status history for a service, newest first.
     
-    service = db.query(Service).filter(
-        and_(
-            Service.id == service_id,
-            Service.organization_id == organization.id,
-            Service.is_active == True
-        )
-    ).first()
+    Pages through (created_at, id) with the last entry id of the previous page as cursor;
+    the next cursor is returned in the X-Next-Cursor header while more entries may follow.
+    """
+    await get_organization_service(db, organization, service_id)
     
-    if not service:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Service not found"
-        )
+    query = select(ServiceStatusHistory).where(ServiceStatusHistory.service_id == service_id)
+    if cursor is not None:
+        query = query.where(before_cursor(ServiceStatusHistory, cursor))
     
-    history = db.query(ServiceStatusHistory).filter(
-        ServiceStatusHistory.service_id == service_id
-    ).order_by(ServiceStatusHistory.created_at.desc()).limit(limit).all()
+    history = (await db.scalars(
+        query.order_by(ServiceStatusHistory.created_at.desc(), ServiceStatusHistory.id.desc()).limit(limit)
+    )).all()
     
-    return [
+    return ORJSONResponse([
         {
             "id": entry.id,
             "status": entry.status.value,
             "previous_status": entry.previous_status.value if entry.previous_status else None,
             "reason": entry.reason,
             "automated": entry.automated,
-            "created_at": entry.created_at.isoformat()
+            "created_at": entry.created_at
         } for entry in history
-    ] 
\ No newline at end of file
+    ], headers=page_headers(history, limit))
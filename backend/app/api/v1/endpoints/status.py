@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, selectinload
+from sqlalchemy import and_, case, column, desc, func, literal, select, union_all
+from typing import Dict, List, Optional
 from pydantic import BaseModel
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import hashlib
+import orjson
 
-from app.core.database import get_db
+from app.core.cache import cache
+from app.core.database import STRICT_LOADING, get_async_db
+from app.core.uptime import (
+    UPTIME_WINDOW_DAYS,
+    get_window_operational_seconds,
+    start_of_day,
+)
 from app.models.organization import Organization
 from app.models.service import Service, ServiceStatus, ServiceStatusHistory
 from app.models.incident import Incident, IncidentStatus, IncidentSeverity, IncidentUpdate
@@ -13,13 +22,23 @@ from app.models.user import User
 
 router = APIRouter()
 
+# Longest window served by the status history endpoint
+MAX_HISTORY_DAYS = 365
+
+# Public status pages may be served by browsers and shared caches (CDNs) for a few
+# seconds, and stale for a while longer while they revalidate in the background
+STATUS_PAGE_CACHE_CONTROL = "public, max-age=10, stale-while-revalidate=60"
+
 # Response models
 class ServiceStatusResponse(BaseModel):
     id: int
     name: str
     description: Optional[str]
     status: ServiceStatus
-    last_status_change: str
+    last_status_change: datetime
+
+    class Config:
+        from_attributes = True
 
 class IncidentResponse(BaseModel):
     id: int
@@ -27,8 +46,8 @@ class IncidentResponse(BaseModel):
     description: str
     status: IncidentStatus
     severity: IncidentSeverity
-    started_at: str
-    resolved_at: Optional[str]
+    started_at: datetime
+    resolved_at: Optional[datetime]
     affected_services: List[dict]
     latest_update: Optional[dict]
 
@@ -40,106 +59,115 @@ class StatusPageResponse(BaseModel):
     recent_incidents: List[IncidentResponse]
     uptime_percentage: Optional[float]
 
+class StatusSummaryResponse(BaseModel):
+    overall_status: str
+    uptime_percentage: float
+
 class StatusHistoryResponse(BaseModel):
     date: str
     services: List[dict]
 
+# Worst status first; the overall status is the worst status of any active service
+STATUS_PRECEDENCE = {
+    ServiceStatus.MAJOR_OUTAGE: 0,
+    ServiceStatus.PARTIAL_OUTAGE: 1,
+    ServiceStatus.DEGRADED_PERFORMANCE: 2,
+    ServiceStatus.MAINTENANCE: 3,
+    ServiceStatus.OPERATIONAL: 4,
+}
+STATUSES_BY_PRECEDENCE = sorted(STATUS_PRECEDENCE, key=STATUS_PRECEDENCE.get)
+
 def calculate_overall_status(services: List[Service]) -> str:
     """Calculate overall system status based on service statuses"""
-    if not services:
-        return "operational"
-    
-    statuses = [service.status for service in services if service.is_active]
-    
-    if not statuses:
-        return "operational"
-    
-    # Check for major outages
-    if ServiceStatus.MAJOR_OUTAGE in statuses:
-        return "major_outage"
-    
-    # Check for partial outages
-    if ServiceStatus.PARTIAL_OUTAGE in statuses:
-        return "partial_outage"
+    worst = STATUS_PRECEDENCE[ServiceStatus.OPERATIONAL]
+    for service in services:
+        if service.is_active:
+            worst = min(worst, STATUS_PRECEDENCE[service.status])
+            # Nothing is worse than a major outage
+            if worst == 0:
+                break
     
-    # Check for degraded performance
-    if ServiceStatus.DEGRADED_PERFORMANCE in statuses:
-        return "degraded_performance"
+    return STATUSES_BY_PRECEDENCE[worst].value
+
+async def get_latest_updates(db: AsyncSession, incident_ids: List[int]) -> Dict[int, IncidentUpdate]:
+    """Get the most recent update of each incident in one query"""
+    if not incident_ids:
+        return {}
+    
+    ranked = select(
+        IncidentUpdate,
+        func.row_number().over(
+            partition_by=IncidentUpdate.incident_id,
+            order_by=(IncidentUpdate.created_at.desc(), IncidentUpdate.id.desc())
+        ).label("rn")
+    ).where(IncidentUpdate.incident_id.in_(incident_ids)).subquery()
+    latest_update = aliased(IncidentUpdate, ranked)
+    
+    updates = (await db.scalars(select(latest_update).where(ranked.c.rn == 1))).all()
+    return {update.incident_id: update for update in updates}
+
+async def calculate_uptime_percentage(services: List[Service], db: AsyncSession, days: int = UPTIME_WINDOW_DAYS) -> float:
+    """Calculate uptime percentage over the last N days.
     
-    # Check for maintenance
-    if ServiceStatus.MAINTENANCE in statuses:
-        return "maintenance"
+    Completed days come from the daily rollups where they exist; today and any day
+    not rolled up yet are computed from the status history.
+    """
+    active_services = [s for s in services if s.is_active]
     
-    # All operational
-    return "operational"
-
-def calculate_uptime_percentage(services: List[Service], db: Session, days: int = 30) -> float:
-    """Calculate uptime percentage over the last N days"""
-    if not services:
+    if not active_services:
         return 100.0
     
-    total_uptime = 0.0
-    service_count = len([s for s in services if s.is_active])
+    service_ids = [service.id for service in active_services]
+    now = datetime.now(timezone.utc)
+    first_day = start_of_day(now) - timedelta(days=days - 1)
+    total_time = (now - first_day).total_seconds()
     
-    if service_count == 0:
-        return 100.0
+    operational_seconds = await get_window_operational_seconds(db, service_ids, first_day, now)
     
-    for service in services:
-        if not service.is_active:
-            continue
-            
-        # Get status history for the last N days
-        cutoff_date = datetime.utcnow().replace(tzinfo=None) - timedelta(days=days)
-        
-        history = db.query(ServiceStatusHistory).filter(
-            and_(
-                ServiceStatusHistory.service_id == service.id,
-                ServiceStatusHistory.created_at >= cutoff_date
-            )
-        ).order_by(ServiceStatusHistory.created_at).all()
-        
-        if not history:
-            # No history means operational
-            total_uptime += 100.0
-            continue
-        
-        # Calculate uptime based on status changes
-        operational_time = 0
-        total_time = days * 24 * 60 * 60  # seconds
-        
-        current_status = ServiceStatus.OPERATIONAL
-        last_change = cutoff_date
-        
-        for entry in history:
-            # Add time in previous status
-            if current_status == ServiceStatus.OPERATIONAL:
-                entry_time = entry.created_at.replace(tzinfo=None) if entry.created_at.tzinfo else entry.created_at
-                change_time = last_change.replace(tzinfo=None) if hasattr(last_change, 'tzinfo') and last_change.tzinfo else last_change
-                operational_time += (entry_time - change_time).total_seconds()
-            
-            current_status = entry.status
-            last_change = entry.created_at.replace(tzinfo=None) if entry.created_at.tzinfo else entry.created_at
-        
-        # Add remaining time in current status
-        if current_status == ServiceStatus.OPERATIONAL:
-            operational_time += (datetime.utcnow().replace(tzinfo=None) - last_change).total_seconds()
-        
-        service_uptime = (operational_time / total_time) * 100
-        total_uptime += min(service_uptime, 100.0)
+    total_uptime = 0.0
+    for service_id in service_ids:
+        total_uptime += min(operational_seconds[service_id] / total_time * 100, 100.0)
     
-    return round(total_uptime / service_count, 2)
+    return round(total_uptime / len(active_services), 2)
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether any entity tag in an If-None-Match header matches etag (weakly, as the header compares)"""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+def status_page_response(request: Request, body: bytes) -> Response:
+    """Respond with a status page body, or 304 when the client already has it"""
+    headers = {
+        "Cache-Control": STATUS_PAGE_CACHE_CONTROL,
+        "ETag": f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    }
+    if etag_matches(request.headers.get("if-none-match", ""), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.get("/{org_slug}")
-async def get_public_status(org_slug: str, db: Session = Depends(get_db)):
-    """Get public status page for an organization"""
+async def get_public_status(org_slug: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Get public status page for an organization.
+    
+    Pages are read-heavy and can be a few seconds stale, so the whole response is
+    cached per slug and dropped when the organization's services or incidents change.
+    """
+    cached = await cache.get_status_page(org_slug)
+    if cached is not None:
+        return status_page_response(request, cached.encode())
     
     # Find organization by slug
-    organization = db.query(Organization).filter(
-        and_(
-            Organization.slug == org_slug,
-            Organization.is_public == True
+    organization = await db.scalar(
+        select(Organization).where(
+            and_(
+                Organization.slug == org_slug,
+                Organization.is_public == True
+            )
         )
-    ).first()
+    )
     
     if not organization:
         raise HTTPException(
@@ -147,50 +175,60 @@ async def get_public_status(org_slug: str, db: Session = Depends(get_db)):
             detail="Status page not found"
         )
     
-    # Get active services
-    services = db.query(Service).filter(
-        and_(
-            Service.organization_id == organization.id,
-            Service.is_active == True
-        )
-    ).order_by(Service.sort_order, Service.name).all()
+    # Get active services, only the columns the page and its status/uptime calculations use
+    services = (await db.execute(
+        select(
+            Service.id,
+            Service.name,
+            Service.description,
+            Service.status,
+            Service.is_active,
+            Service.last_status_change
+        ).where(
+            and_(
+                Service.organization_id == organization.id,
+                Service.is_active == True
+            )
+        ).order_by(Service.sort_order, Service.name)
+    )).all()
     
-    # Get active incidents (not resolved)
-    active_incidents = db.query(Incident).filter(
+    # Get active incidents (not resolved, newest first) and recent resolved ones (last 30 days,
+    # latest resolution first) in one round-trip, tagged by bucket, with their services
+    thirty_days_ago = datetime.utcnow().replace(tzinfo=None) - timedelta(days=30)
+    active = select(Incident, literal("active").label("bucket"), Incident.created_at.label("sort_at")).where(
         and_(
             Incident.organization_id == organization.id,
             Incident.status != IncidentStatus.RESOLVED
         )
-    ).order_by(desc(Incident.created_at)).all()
-    
-    # Get recent resolved incidents (last 30 days)
-    thirty_days_ago = datetime.utcnow().replace(tzinfo=None) - timedelta(days=30)
-    recent_incidents = db.query(Incident).filter(
+    )
+    recent = select(Incident, literal("recent").label("bucket"), Incident.resolved_at.label("sort_at")).where(
         and_(
             Incident.organization_id == organization.id,
             Incident.status == IncidentStatus.RESOLVED,
             Incident.resolved_at >= thirty_days_ago
         )
-    ).order_by(desc(Incident.resolved_at)).limit(10).all()
+    ).order_by(desc(Incident.resolved_at)).limit(10).subquery()
+    incidents = (await db.execute(
+        select(Incident, column("bucket")).from_statement(
+            union_all(active, select(recent)).order_by(column("bucket"), desc(column("sort_at")))
+        ).options(
+            selectinload(Incident.affected_services).load_only(Service.id, Service.name),
+            *STRICT_LOADING
+        )
+    )).all()
+    active_incidents = [incident for incident, bucket in incidents if bucket == "active"]
+    recent_incidents = [incident for incident, bucket in incidents if bucket == "recent"]
     
     # Format services
-    service_responses = []
-    for service in services:
-        service_responses.append(ServiceStatusResponse(
-            id=service.id,
-            name=service.name,
-            description=service.description,
-            status=service.status,
-            last_status_change=service.last_status_change.isoformat() if service.last_status_change else ""
-        ))
+    service_responses = [ServiceStatusResponse.model_validate(service) for service in services]
+    
+    latest_updates = await get_latest_updates(db, [incident.id for incident in active_incidents])
     
     # Format active incidents
     active_incident_responses = []
     for incident in active_incidents:
-        # Get latest update
-        latest_update = db.query(IncidentUpdate).filter(
-            IncidentUpdate.incident_id == incident.id
-        ).order_by(desc(IncidentUpdate.created_at)).first()
+        # Latest update, if any
+        latest_update = latest_updates.get(incident.id)
         
         affected_services = [
             {
@@ -205,13 +243,13 @@ async def get_public_status(org_slug: str, db: Session = Depends(get_db)):
             description=incident.description,
             status=incident.status,
             severity=incident.severity,
-            started_at=incident.started_at.isoformat(),
+            started_at=incident.started_at,
             resolved_at=None,
             affected_services=affected_services,
             latest_update={
                 "title": latest_update.title,
                 "message": latest_update.message,
-                "created_at": latest_update.created_at.isoformat()
+                "created_at": latest_update.created_at
             } if latest_update else None
         ))
     
@@ -231,17 +269,20 @@ async def get_public_status(org_slug: str, db: Session = Depends(get_db)):
             description=incident.description,
             status=incident.status,
             severity=incident.severity,
-            started_at=incident.started_at.isoformat(),
-            resolved_at=incident.resolved_at.isoformat() if incident.resolved_at else None,
+            started_at=incident.started_at,
+            resolved_at=incident.resolved_at,
             affected_services=affected_services,
             latest_update=None
         ))
     
     # Calculate overall status and uptime
     overall_status = calculate_overall_status(services)
-    uptime_percentage = calculate_uptime_percentage(services, db)
+    uptime_percentage = await cache.get_status_page_uptime(organization.id)
+    if uptime_percentage is None:
+        uptime_percentage = await calculate_uptime_percentage(services, db)
+        await cache.set_status_page_uptime(organization.id, uptime_percentage)
     
-    return StatusPageResponse(
+    body = orjson.dumps(StatusPageResponse(
         organization={
             "name": organization.name,
             "description": organization.description,
@@ -253,23 +294,67 @@ async def get_public_status(org_slug: str, db: Session = Depends(get_db)):
         active_incidents=active_incident_responses,
         recent_incidents=recent_incident_responses,
         uptime_percentage=uptime_percentage
+    ).model_dump())
+    await cache.set_status_page(org_slug, body)
+    
+    return status_page_response(request, body)
+
+@router.get("/{org_slug}/summary", response_model=StatusSummaryResponse)
+async def get_status_summary(org_slug: str, db: AsyncSession = Depends(get_async_db)):
+    """Get just the overall status and uptime of an organization (e.g. for badges)"""
+    
+    # Find organization
+    organization = await db.scalar(
+        select(Organization).where(
+            and_(
+                Organization.slug == org_slug,
+                Organization.is_public == True
+            )
+        )
+    )
+    
+    if not organization:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Status page not found"
+        )
+    
+    # Worst status of any active service, picked in the database
+    precedence = case(
+        *((Service.status == service_status, rank) for service_status, rank in STATUS_PRECEDENCE.items())
+    )
+    active = and_(
+        Service.organization_id == organization.id,
+        Service.is_active == True
     )
+    worst_status = await db.scalar(select(Service.status).where(active).order_by(precedence).limit(1))
+    overall_status = (worst_status or ServiceStatus.OPERATIONAL).value
+    
+    uptime_percentage = await cache.get_status_page_uptime(organization.id)
+    if uptime_percentage is None:
+        services = (await db.execute(select(Service.id, Service.is_active).where(active))).all()
+        uptime_percentage = await calculate_uptime_percentage(services, db)
+        await cache.set_status_page_uptime(organization.id, uptime_percentage)
+    
+    return StatusSummaryResponse(overall_status=overall_status, uptime_percentage=uptime_percentage)
 
 @router.get("/{org_slug}/history")
 async def get_status_history(
     org_slug: str, 
-    days: int = 30,
-    db: Session = Depends(get_db)
+    days: int = Query(30, ge=1, le=MAX_HISTORY_DAYS),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get status history for the last N days"""
     
     # Find organization
-    organization = db.query(Organization).filter(
-        and_(
-            Organization.slug == org_slug,
-            Organization.is_public == True
+    organization = await db.scalar(
+        select(Organization).where(
+            and_(
+                Organization.slug == org_slug,
+                Organization.is_public == True
+            )
         )
-    ).first()
+    )
     
     if not organization:
         raise HTTPException(
@@ -278,33 +363,45 @@ async def get_status_history(
         )
     
     # Get services
-    services = db.query(Service).filter(
-        and_(
-            Service.organization_id == organization.id,
-            Service.is_active == True
+    services = (await db.execute(
+        select(Service.id, Service.name).where(
+            and_(
+                Service.organization_id == organization.id,
+                Service.is_active == True
+            )
         )
-    ).all()
+    )).all()
+    
+    # Most recent day first
+    now = datetime.utcnow().replace(tzinfo=None)
+    dates = [now - timedelta(days=i) for i in range(days)]
+    
+    # Status at the end of every day for every service in one query: one row per
+    # service, one column per day holding the latest status change up to that day's end
+    def status_at(day_end: datetime):
+        return select(ServiceStatusHistory.status).where(
+            and_(
+                ServiceStatusHistory.service_id == Service.id,
+                ServiceStatusHistory.created_at <= day_end
+            )
+        ).order_by(desc(ServiceStatusHistory.created_at)).limit(1).correlate(Service).scalar_subquery()
+    
+    daily_statuses = {}
+    if services:
+        rows = (await db.execute(
+            select(
+                Service.id,
+                *(status_at(date.replace(hour=23, minute=59, second=59)) for date in dates)
+            ).where(Service.id.in_([service.id for service in services]))
+        )).all()
+        daily_statuses = {row[0]: row[1:] for row in rows}
     
     # Generate daily status for the last N days
     history = []
-    for i in range(days):
-        date = datetime.utcnow().replace(tzinfo=None) - timedelta(days=i)
-        date_str = date.strftime("%Y-%m-%d")
-        
+    for i, date in enumerate(dates):
         daily_services = []
         for service in services:
-            # Get the status at the end of this day
-            day_end = date.replace(hour=23, minute=59, second=59)
-            
-            # Find the most recent status change before or on this day
-            status_entry = db.query(ServiceStatusHistory).filter(
-                and_(
-                    ServiceStatusHistory.service_id == service.id,
-                    ServiceStatusHistory.created_at <= day_end
-                )
-            ).order_by(desc(ServiceStatusHistory.created_at)).first()
-            
-            status = status_entry.status if status_entry else ServiceStatus.OPERATIONAL
+            status = daily_statuses[service.id][i] or ServiceStatus.OPERATIONAL
             
             daily_services.append({
                 "id": service.id,
@@ -313,7 +410,7 @@ async def get_status_history(
             })
         
         history.append(StatusHistoryResponse(
-            date=date_str,
+            date=date.strftime("%Y-%m-%d"),
             services=daily_services
         ))
     
@@ -323,17 +420,19 @@ async def get_status_history(
 async def get_public_incidents(
     org_slug: str,
     limit: int = 20,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get public incidents for an organization"""
     
     # Find organization
-    organization = db.query(Organization).filter(
-        and_(
-            Organization.slug == org_slug,
-            Organization.is_public == True
+    organization = await db.scalar(
+        select(Organization).where(
+            and_(
+                Organization.slug == org_slug,
+                Organization.is_public == True
+            )
         )
-    ).first()
+    )
     
     if not organization:
         raise HTTPException(
@@ -341,17 +440,20 @@ async def get_public_incidents(
             detail="Status page not found"
         )
     
-    # Get incidents
-    incidents = db.query(Incident).filter(
-        Incident.organization_id == organization.id
-    ).order_by(desc(Incident.created_at)).limit(limit).all()
+    # Get incidents with their services and updates (newest first)
+    incidents = (await db.scalars(
+        select(Incident).options(
+            selectinload(Incident.affected_services).load_only(Service.id, Service.name),
+            selectinload(Incident.updates),
+            *STRICT_LOADING
+        ).where(
+            Incident.organization_id == organization.id
+        ).order_by(desc(Incident.created_at)).limit(limit)
+    )).all()
     
     incident_responses = []
     for incident in incidents:
-        # Get all updates
-        updates = db.query(IncidentUpdate).filter(
-            IncidentUpdate.incident_id == incident.id
-        ).order_by(desc(IncidentUpdate.created_at)).all()
+        updates = incident.updates
         
         affected_services = [
             {
@@ -366,15 +468,15 @@ async def get_public_incidents(
             "description": incident.description,
             "status": incident.status.value,
             "severity": incident.severity.value,
-            "started_at": incident.started_at.isoformat(),
-            "resolved_at": incident.resolved_at.isoformat() if incident.resolved_at else None,
+            "started_at": incident.started_at,
+            "resolved_at": incident.resolved_at,
             "affected_services": affected_services,
             "updates": [
                 {
                     "title": update.title,
                     "message": update.message,
                     "status": update.status.value,
-                    "created_at": update.created_at.isoformat()
+                    "created_at": update.created_at
                 } for update in updates
             ]
         })
@@ -385,17 +487,19 @@ async def get_public_incidents(
 async def get_public_incident(
     org_slug: str, 
     incident_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific public incident"""
     
     # Find organization
-    organization = db.query(Organization).filter(
-        and_(
-            Organization.slug == org_slug,
-            Organization.is_public == True
+    organization = await db.scalar(
+        select(Organization).where(
+            and_(
+                Organization.slug == org_slug,
+                Organization.is_public == True
+            )
         )
-    ).first()
+    )
     
     if not organization:
         raise HTTPException(
@@ -403,13 +507,19 @@ async def get_public_incident(
             detail="Status page not found"
         )
     
-    # Get incident
-    incident = db.query(Incident).filter(
-        and_(
-            Incident.id == incident_id,
-            Incident.organization_id == organization.id
+    # Get incident with its services and updates (newest first)
+    incident = await db.scalar(
+        select(Incident).options(
+            selectinload(Incident.affected_services),
+            selectinload(Incident.updates),
+            *STRICT_LOADING
+        ).where(
+            and_(
+                Incident.id == incident_id,
+                Incident.organization_id == organization.id
+            )
         )
-    ).first()
+    )
     
     if not incident:
         raise HTTPException(
@@ -417,10 +527,7 @@ async def get_public_incident(
             detail="Incident not found"
         )
     
-    # Get all updates
-    updates = db.query(IncidentUpdate).filter(
-        IncidentUpdate.incident_id == incident.id
-    ).order_by(desc(IncidentUpdate.created_at)).all()
+    updates = incident.updates
     
     affected_services = [
         {
@@ -436,15 +543,15 @@ async def get_public_incident(
         "description": incident.description,
         "status": incident.status.value,
         "severity": incident.severity.value,
-        "started_at": incident.started_at.isoformat(),
-        "resolved_at": incident.resolved_at.isoformat() if incident.resolved_at else None,
+        "started_at": incident.started_at,
+        "resolved_at": incident.resolved_at,
         "affected_services": affected_services,
         "updates": [
             {
                 "title": update.title,
                 "message": update.message,
                 "status": update.status.value,
-                "created_at": update.created_at.isoformat()
+                "created_at": update.created_at
             } for update in updates
         ]
     } 
\ No newline at end of file
@@ -1,13 +1,18 @@
+import asyncio
+import hashlib
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, List, NamedTuple, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from decouple import config
 
-from app.core.database import get_db
+from app.core.cache import cache
+from app.core.database import AsyncSessionLocal, get_async_db
 from app.models.user import User
 
 # Configuration
@@ -15,6 +20,11 @@ SECRET_KEY = config("SECRET_KEY", default="your-secret-key-change-this-in-produc
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = config("ACCESS_TOKEN_EXPIRE_MINUTES", default=1440, cast=int)  # 24 hours for development
 REFRESH_TOKEN_EXPIRE_DAYS = config("REFRESH_TOKEN_EXPIRE_DAYS", default=7, cast=int)
+# Users change outside the app (e.g. deactivated in the database), so cached lookups
+# expire quickly rather than waiting on an invalidation
+USER_CACHE_TTL = config("USER_CACHE_TTL", default=60, cast=int)
+AUTH_BATCH_WINDOW_MS = config("AUTH_BATCH_WINDOW_MS", default=2, cast=float)
+TOKEN_CACHE_MAX_ENTRIES = config("TOKEN_CACHE_MAX_ENTRIES", default=10000, cast=int)
 
 # Password context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -58,19 +68,60 @@ def create_refresh_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+class ValidTokenCache:
+    """In-process cache of decoded tokens, each kept no longer than the token itself is valid"""
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: Dict[bytes, Tuple[float, dict]] = {}
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()[:16]
+
+    def get(self, token: str) -> Optional[dict]:
+        """Return the cached claims for token, or None if absent or expired"""
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return payload
+
+    def set(self, token: str, payload: dict):
+        """Remember verified claims until the token's exp"""
+        ttl = payload.get("exp", 0) - time.time()
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        if len(self._entries) >= self.max_entries:
+            self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+            if len(self._entries) >= self.max_entries:
+                # Still full; drop the oldest entry
+                del self._entries[next(iter(self._entries))]
+        self._entries[self._key(token)] = (now + ttl, payload)
+
+valid_token_cache = ValidTokenCache()
+
 def verify_token(token: str, token_type: str = "access") -> dict:
     """Verify and decode a JWT token"""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        if payload.get("type") != token_type:
-            raise AuthenticationError("Invalid token type")
-        return payload
-    except JWTError:
-        raise AuthenticationError()
+    payload = valid_token_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise AuthenticationError()
+        valid_token_cache.set(token, payload)
+    if payload.get("type") != token_type:
+        raise AuthenticationError("Invalid token type")
+    return payload
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Get the current authenticated user"""
     token = credentials.credentials
@@ -80,7 +131,7 @@ def get_current_user(
     if user_id is None:
         raise AuthenticationError()
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await get_cached_user(db, int(user_id))
     if user is None:
         raise AuthenticationError()
     
@@ -92,6 +143,17 @@ def get_current_user(
     
     return user
 
+async def get_cached_user(db: AsyncSession, user_id: int) -> Optional[User]:
+    """Load a user, checking the cache before the database"""
+    cached = await cache.get_user(user_id)
+    if cached is not None:
+        return User(**cached)
+    
+    user = await db.scalar(select(User).where(User.id == user_id))
+    if user is not None:
+        await cache.set_user(user, USER_CACHE_TTL)
+    return user
+
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get the current active user"""
     if not current_user.is_active:
@@ -101,11 +163,62 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
         )
     return current_user
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
-    """Authenticate a user with email and password"""
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
+class UserCredentials(NamedTuple):
+    """The columns login needs to check a password, without a full User"""
+    id: int
+    email: str
+    hashed_password: str
+
+class AuthBatcher:
+    """Coalesce concurrent credential-by-email lookups into a single IN query"""
+
+    def __init__(self, window_ms: float = AUTH_BATCH_WINDOW_MS):
+        self.window = window_ms / 1000
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def get_credentials_by_email(self, email: str) -> Optional[UserCredentials]:
+        """Queue an email lookup and wait for the batch it lands in"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(email, []).append(future)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        return await future
+
+    async def _flush(self):
+        """Wait for the batching window, then resolve every queued lookup"""
+        await asyncio.sleep(self.window)
+        batch, self._pending = self._pending, {}
+        self._flush_task = None
+        
+        try:
+            async with AsyncSessionLocal() as db:
+                # Only active accounts can log in; matches the users_active_email partial index
+                rows = (await db.execute(
+                    select(User.id, User.email, User.hashed_password)
+                    .where(User.email.in_(list(batch)), User.is_active)
+                )).all()
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        
+        credentials_by_email = {row.email: UserCredentials(*row) for row in rows}
+        for email, futures in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(credentials_by_email.get(email))
+
+auth_batcher = AuthBatcher()
+
+async def authenticate_user(email: str, password: str) -> Optional[UserCredentials]:
+    """Authenticate a user with email and password, returning only their credentials"""
+    credentials = await auth_batcher.get_credentials_by_email(email)
+    if not credentials:
         return None
-    if not verify_password(password, user.hashed_password):
+    # bcrypt is CPU-bound; run it in a worker thread to keep the event loop free
+    if not await asyncio.to_thread(verify_password, password, credentials.hashed_password):
         return None
-    return user 
\ No newline at end of file
+    return credentials 
\ No newline at end of file
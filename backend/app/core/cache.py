@@ -0,0 +1,165 @@
+import logging
+from typing import Any, Optional
+
+import orjson
+from decouple import config
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration (caching is disabled when REDIS_URL is not set)
+REDIS_URL = config("REDIS_URL", default="")
+
+# Public organization listing (/auth/organizations without a limit)
+PUBLIC_ORGANIZATIONS_KEY = "orgs:public:v1"
+PUBLIC_ORGANIZATIONS_TTL = config("PUBLIC_ORGANIZATIONS_CACHE_TTL", default=60, cast=int)
+
+# Per-organization uptime metrics responses, keyed by period type
+UPTIME_METRICS_PERIODS = ("daily", "hourly")
+UPTIME_METRICS_TTL = config("UPTIME_METRICS_CACHE_TTL", default=60, cast=int)
+
+# Public status pages, keyed by organization slug
+STATUS_PAGE_TTL = config("STATUS_PAGE_CACHE_TTL", default=10, cast=int)
+STATUS_PAGE_UPTIME_TTL = config("STATUS_PAGE_UPTIME_CACHE_TTL", default=3600, cast=int)
+
+# Organization each user's requests are scoped to, and the organization fields those requests use
+USER_ORGANIZATION_TTL = config("USER_ORGANIZATION_CACHE_TTL", default=600, cast=int)
+ORGANIZATION_TTL = config("ORGANIZATION_CACHE_TTL", default=600, cast=int)
+ORGANIZATION_CACHE_FIELDS = ("id", "name", "slug", "description", "is_public")
+
+# Only non-sensitive profile fields are cached for users
+USER_CACHE_FIELDS = ("id", "email", "username", "full_name", "is_active", "is_verified")
+
+class RedisCache:
+    """Cache-aside helper backed by Redis; every call is a no-op when Redis is unavailable"""
+
+    def __init__(self, url: str = ""):
+        self.client = aioredis.from_url(url, decode_responses=True) if url else None
+
+    async def get_raw(self, key: str) -> Optional[str]:
+        """Return the stored string for key, or None on a miss"""
+        if self.client is None:
+            return None
+        try:
+            return await self.client.get(key)
+        except RedisError as e:
+            logger.warning(f"Cache read failed for {key}: {e}")
+            return None
+
+    async def set_raw(self, key: str, value: bytes, ttl: int):
+        """Store already-serialized value under key for ttl seconds"""
+        if self.client is None:
+            return
+        try:
+            await self.client.set(key, value, ex=ttl)
+        except RedisError as e:
+            logger.warning(f"Cache write failed for {key}: {e}")
+
+    async def get_json(self, key: str) -> Optional[Any]:
+        """Return the decoded value for key, or None on a miss"""
+        value = await self.get_raw(key)
+        return orjson.loads(value) if value is not None else None
+
+    async def set_json(self, key: str, value: Any, ttl: int):
+        """Store value under key for ttl seconds"""
+        await self.set_raw(key, orjson.dumps(value), ttl)
+
+    async def delete(self, *keys: str):
+        """Remove keys from the cache"""
+        if self.client is None or not keys:
+            return
+        try:
+            await self.client.delete(*keys)
+        except RedisError as e:
+            logger.warning(f"Cache delete failed for {keys}: {e}")
+
+    async def get_user(self, user_id: int) -> Optional[dict]:
+        """Get cached user fields"""
+        return await self.get_json(f"user:{user_id}")
+
+    async def set_user(self, user, ttl: int):
+        """Cache the minimal user fields needed for authentication"""
+        await self.set_json(
+            f"user:{user.id}",
+            {field: getattr(user, field) for field in USER_CACHE_FIELDS},
+            ttl
+        )
+
+    async def get_user_organization_id(self, user_id: int) -> Optional[int]:
+        """Get the cached organization id for a user"""
+        return await self.get_json(f"user_org:{user_id}")
+
+    async def set_user_organization_id(self, user_id: int, organization_id: int):
+        """Cache the organization id a user's requests are scoped to"""
+        await self.set_json(f"user_org:{user_id}", organization_id, USER_ORGANIZATION_TTL)
+
+    async def invalidate_user_organization(self, user_id: int):
+        """Drop a user's cached organization id after their memberships change"""
+        await self.delete(f"user_org:{user_id}")
+
+    async def get_organization(self, organization_id: int) -> Optional[dict]:
+        """Get cached organization fields"""
+        return await self.get_json(f"org:{organization_id}")
+
+    async def set_organization(self, organization):
+        """Cache the organization fields authenticated requests need"""
+        await self.set_json(
+            f"org:{organization.id}",
+            {field: getattr(organization, field) for field in ORGANIZATION_CACHE_FIELDS},
+            ORGANIZATION_TTL
+        )
+
+    async def get_public_organizations(self) -> Optional[dict]:
+        """Get the cached listing of public organizations"""
+        return await self.get_json(PUBLIC_ORGANIZATIONS_KEY)
+
+    async def set_public_organizations(self, page: dict):
+        """Cache the listing of public organizations"""
+        await self.set_json(PUBLIC_ORGANIZATIONS_KEY, page, PUBLIC_ORGANIZATIONS_TTL)
+
+    async def invalidate_public_organizations(self):
+        """Drop the cached listing after an organization is added or changed"""
+        await self.delete(PUBLIC_ORGANIZATIONS_KEY)
+
+    async def get_uptime_metrics(self, organization_id: int, period_type: str) -> Optional[str]:
+        """Get a cached uptime metrics response body (JSON)"""
+        return await self.get_raw(f"uptime:{organization_id}:{period_type}")
+
+    async def set_uptime_metrics(self, organization_id: int, period_type: str, body: bytes):
+        """Cache a serialized uptime metrics response body"""
+        await self.set_raw(f"uptime:{organization_id}:{period_type}", body, UPTIME_METRICS_TTL)
+
+    async def invalidate_uptime_metrics(self, organization_id: int):
+        """Drop an organization's cached uptime metrics after its services or their status change"""
+        await self.delete(
+            *(f"uptime:{organization_id}:{period}" for period in UPTIME_METRICS_PERIODS),
+            f"uptime:{organization_id}:status_page"
+        )
+
+    async def get_status_page(self, org_slug: str) -> Optional[str]:
+        """Get a cached public status page response body (JSON)"""
+        return await self.get_raw(f"statuspage:{org_slug}")
+
+    async def set_status_page(self, org_slug: str, body: bytes):
+        """Cache a serialized public status page response body"""
+        await self.set_raw(f"statuspage:{org_slug}", body, STATUS_PAGE_TTL)
+
+    async def invalidate_status_page(self, org_slug: str):
+        """Drop a cached status page after the organization's services or incidents change"""
+        await self.delete(f"statuspage:{org_slug}")
+
+    async def get_status_page_uptime(self, organization_id: int) -> Optional[float]:
+        """Get the cached uptime percentage shown on an organization's status page"""
+        return await self.get_json(f"uptime:{organization_id}:status_page")
+
+    async def set_status_page_uptime(self, organization_id: int, uptime: float):
+        """Cache the uptime percentage shown on an organization's status page"""
+        await self.set_json(f"uptime:{organization_id}:status_page", uptime, STATUS_PAGE_UPTIME_TTL)
+
+    async def close(self):
+        """Close the Redis connection pool"""
+        if self.client is not None:
+            await self.client.aclose()
+
+cache = RedisCache(REDIS_URL)
@@ -1,6 +1,8 @@
-from sqlalchemy import create_engine
+from sqlalchemy import FetchedValue, create_engine, event, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import raiseload, sessionmaker
+from sqlalchemy.pool import NullPool
 from decouple import config
 import os
 
@@ -14,12 +16,88 @@ DATABASE_URL = config(
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-# Create engine
-engine = create_engine(DATABASE_URL)
+# Async driver URL for request handlers (asyncpg / aiosqlite)
+if DATABASE_URL.startswith("postgresql://"):
+    ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+elif DATABASE_URL.startswith("sqlite://"):
+    ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+else:
+    ASYNC_DATABASE_URL = DATABASE_URL
+
+# Connection pool sizing. Every worker process holds its own pool, so keep
+# (DB_POOL_SIZE + DB_MAX_OVERFLOW) * --workers within Postgres max_connections.
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=20, cast=int)
+DB_MAX_OVERFLOW = config("DB_MAX_OVERFLOW", default=30, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=30, cast=int)
+DB_POOL_RECYCLE = config("DB_POOL_RECYCLE", default=3600, cast=int)
+
+# Set when DATABASE_URL points at PgBouncer in transaction pooling mode
+DB_PGBOUNCER = config("DB_PGBOUNCER", default=False, cast=bool)
+
+pool_options = {}
+if DB_PGBOUNCER:
+    # PgBouncer does the pooling; prepared statements can't survive a
+    # server connection swap between transactions, so disable both caches
+    pool_options = {
+        "poolclass": NullPool,
+        "connect_args": {"statement_cache_size": 0, "prepared_statement_cache_size": 0},
+    }
+elif not ASYNC_DATABASE_URL.startswith("sqlite"):
+    pool_options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+        # Reuse the most recently returned connection so surplus idle ones
+        # stay idle and can be closed by the server after bursts
+        "pool_use_lifo": True,
+    }
+
+# Create async engine (used by async endpoints so queries don't block the event loop);
+# its QueuePool is the asyncio-adapted variant, so checkouts wait without blocking the loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options)
+
+# Create engine (used by the setup scripts); it shares the pool
+# behaviour but not the asyncpg-only connect arguments
+sync_pool_options = {key: value for key, value in pool_options.items() if key != "connect_args"}
+if DATABASE_URL.startswith(("postgresql://", "postgresql+psycopg2://")):
+    # INSERTs are already batched (insertmanyvalues); this also sends executemany
+    # UPDATEs/DELETEs (e.g. ORM bulk updates) in pages instead of a statement per row
+    sync_pool_options["executemany_mode"] = "values_plus_batch"
+engine = create_engine(DATABASE_URL, **sync_pool_options)
+
+# SQLite leaves foreign keys unenforced unless asked per connection; ON DELETE CASCADE relies on them.
+# WAL with synchronous=NORMAL lets reads run alongside a write and skips the fsync on every commit
+if DATABASE_URL.startswith("sqlite"):
+    def configure_sqlite_connection(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+    
+    event.listen(engine, "connect", configure_sqlite_connection)
+    event.listen(async_engine.sync_engine, "connect", configure_sqlite_connection)
+
+# Column options for updated_at: on PostgreSQL a trigger (created with the schema) stamps it
+# inside the UPDATE, so SQLAlchemy doesn't render it into every statement; elsewhere SQLAlchemy sets it
+UPDATED_AT_OPTIONS = {"server_onupdate": FetchedValue()} if DATABASE_URL.startswith("postgresql") else {"onupdate": func.now()}
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create AsyncSessionLocal class; keep attributes loaded after commit so
+# handlers can build responses without triggering implicit async I/O
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Under ENVIRONMENT=test, queries that add these options raise on any relationship
+# load they didn't eager-load explicitly instead of silently emitting extra queries
+ENVIRONMENT = config("ENVIRONMENT", default="development")
+STRICT_LOADING = (raiseload("*"),) if ENVIRONMENT == "test" else ()
+
 # Create Base class for models
 Base = declarative_base()
 
@@ -29,4 +107,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# Dependency to get async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,58 @@
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.auth import get_current_user
+from app.core.cache import cache
+from app.core.database import get_async_db
+from app.models.user import User, OrganizationMember
+from app.models.organization import Organization
+
+async def get_user_organization(db: AsyncSession, user: User) -> Organization:
+    """Get the user's primary organization"""
+    # One round-trip: the outer join still tells a missing membership apart from a missing organization.
+    # Built as a lambda statement so the construct and its cache key are reused across requests.
+    user_id = user.id
+    row = (await db.execute(lambda_stmt(
+        lambda: select(OrganizationMember.id, Organization)
+        .outerjoin(Organization, Organization.id == OrganizationMember.organization_id)
+        .where(OrganizationMember.user_id == user_id)
+        .order_by(OrganizationMember.id)
+        .limit(1)
+    ))).first()
+    
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User is not a member of any organization"
+        )
+    
+    organization = row.Organization
+    if not organization:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Organization not found"
+        )
+    
+    return organization
+
+async def get_current_organization(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+) -> Organization:
+    """Dependency resolving the user's organization once per request, served from cache when possible"""
+    organization_id = await cache.get_user_organization_id(current_user.id)
+    if organization_id is not None:
+        cached = await cache.get_organization(organization_id)
+        if cached is not None:
+            return Organization(**cached)
+        
+        organization = await db.get(Organization, organization_id)
+        if organization is not None:
+            await cache.set_organization(organization)
+            return organization
+    
+    organization = await get_user_organization(db, current_user)
+    await cache.set_user_organization_id(current_user.id, organization.id)
+    await cache.set_organization(organization)
+    return organization
@@ -0,0 +1,17 @@
+from typing import Dict
+
+from sqlalchemy import select, tuple_
+
+def before_cursor(model, cursor: int):
+    """Keyset condition for rows after the cursor row in (created_at, id) descending order.
+    
+    The cursor row's created_at is read in SQL so it compares in the column's own storage format.
+    """
+    cursor_created_at = select(model.created_at).where(model.id == cursor).scalar_subquery()
+    return tuple_(model.created_at, model.id) < tuple_(cursor_created_at, cursor)
+
+def page_headers(rows: list, limit: int) -> Dict[str, str]:
+    """Next-page cursor header for a full page of rows"""
+    if len(rows) < limit:
+        return {}
+    return {"X-Next-Cursor": str(rows[-1].id)}
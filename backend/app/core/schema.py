@@ -0,0 +1,145 @@
+from decouple import config
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Inspector
+
+from app.core.database import Base, engine
+from app.models import import_all_models
+from app.models.user import USERS_ACTIVE_EMAIL_INDEX
+from app.models.incident import (
+    INCIDENTS_ORG_CREATED_INDEX,
+    INCIDENTS_ORG_RESOLVED_INDEX,
+    INCIDENTS_ORG_STATUS_CREATED_INDEX,
+    INCIDENT_UPDATES_INCIDENT_CREATED_INDEX,
+)
+from app.models.service import (
+    SERVICES_ORG_ACTIVE_SORT_INDEX,
+    SERVICE_STATUS_HISTORY_SERVICE_CREATED_INDEX,
+    SERVICE_UPTIME_DAILY_DAY_INDEX,
+)
+
+# Create missing tables and indexes when the app starts. Deployments that run
+# `python -m app.core.schema` as a release step can turn this off so every boot
+# skips the per-table and per-index existence checks
+AUTO_CREATE_SCHEMA = config("AUTO_CREATE_SCHEMA", default=True, cast=bool)
+
+# Indexes added after their tables; create_all only builds indexes alongside new tables,
+# so these are created on existing tables that lack them
+SCHEMA_INDEXES = (
+    USERS_ACTIVE_EMAIL_INDEX,
+    INCIDENTS_ORG_CREATED_INDEX,
+    INCIDENTS_ORG_STATUS_CREATED_INDEX,
+    INCIDENTS_ORG_RESOLVED_INDEX,
+    INCIDENT_UPDATES_INCIDENT_CREATED_INDEX,
+    SERVICES_ORG_ACTIVE_SORT_INDEX,
+    SERVICE_STATUS_HISTORY_SERVICE_CREATED_INDEX,
+    SERVICE_UPTIME_DAILY_DAY_INDEX,
+)
+
+# PostgreSQL trigger function stamping updated_at (see UPDATED_AT_OPTIONS)
+SET_UPDATED_AT_FUNCTION = """
+CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at = now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+def create_updated_at_triggers(connection: Connection):
+    """Create the set_updated_at trigger on every table with an updated_at column that lacks it"""
+    connection.execute(text(SET_UPDATED_AT_FUNCTION))
+    existing = set(connection.scalars(text(
+        "SELECT tgrelid::regclass::text FROM pg_trigger WHERE tgname = 'set_updated_at'"
+    )))
+    for table in Base.metadata.sorted_tables:
+        if "updated_at" in table.c and table.name not in existing:
+            connection.execute(text(
+                f"CREATE TRIGGER set_updated_at BEFORE UPDATE ON {table.name} "
+                "FOR EACH ROW EXECUTE PROCEDURE set_updated_at()"
+            ))
+
+def cascade_foreign_keys(connection: Connection):
+    """Recreate foreign keys declared ondelete="CASCADE" whose constraint predates it
+
+    create_all never alters existing tables, so databases created before the models
+    gained ON DELETE CASCADE still reject deleting an incident that has children.
+    """
+    stale = {
+        (table_name, column_name): constraint_name
+        for constraint_name, table_name, column_name in connection.execute(text(
+            "SELECT c.conname, c.conrelid::regclass::text, a.attname FROM pg_constraint c "
+            "JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1] "
+            "WHERE c.contype = 'f' AND c.confdeltype <> 'c'"
+        ))
+    }
+    for table in Base.metadata.sorted_tables:
+        for foreign_key in table.foreign_keys:
+            constraint_name = stale.get((table.name, foreign_key.parent.name))
+            if foreign_key.ondelete == "CASCADE" and constraint_name:
+                connection.execute(text(
+                    f'ALTER TABLE {table.name} DROP CONSTRAINT "{constraint_name}", '
+                    f'ADD CONSTRAINT "{constraint_name}" FOREIGN KEY ({foreign_key.parent.name}) '
+                    f"REFERENCES {foreign_key.column.table.name} ({foreign_key.column.name}) ON DELETE CASCADE"
+                ))
+
+def rebuild_sqlite_cascade_tables(connection: Connection, inspector: Inspector, tables: set):
+    """Rebuild SQLite tables whose foreign keys lack the ON DELETE CASCADE their model declares
+
+    SQLite can't alter a constraint, so each such table is renamed aside, recreated from its
+    model (indexes included) and refilled, leaving out rows whose parent is already gone.
+    Only child tables that nothing references declare CASCADE, so the rename doesn't
+    rewrite another table's foreign keys.
+    """
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        declared = {fk.parent.name for fk in table.foreign_keys if fk.ondelete == "CASCADE"}
+        existing = {
+            column
+            for fk in inspector.get_foreign_keys(table.name)
+            if (fk["options"].get("ondelete") or "").upper() == "CASCADE"
+            for column in fk["constrained_columns"]
+        }
+        if declared <= existing:
+            continue
+        legacy_name = f"_{table.name}_legacy"
+        indexes = [index["name"] for index in inspector.get_indexes(table.name)]
+        columns = ", ".join(c["name"] for c in inspector.get_columns(table.name) if c["name"] in table.c)
+        parents_exist = " AND ".join(
+            f"({fk.parent.name} IS NULL OR {fk.parent.name} IN "
+            f"(SELECT {fk.column.name} FROM {fk.column.table.name}))"
+            for fk in table.foreign_keys
+        )
+        connection.execute(text(f"ALTER TABLE {table.name} RENAME TO {legacy_name}"))
+        for index_name in indexes:
+            connection.execute(text(f'DROP INDEX "{index_name}"'))
+        table.create(connection)
+        connection.execute(text(
+            f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {legacy_name} WHERE {parents_exist}"
+        ))
+        connection.execute(text(f"DROP TABLE {legacy_name}"))
+
+def create_schema(connection: Connection):
+    """Create any missing tables, indexes, triggers and foreign key cascades"""
+    import_all_models()
+    # Read the existing tables and indexes in one catalog query each rather than
+    # checking every table and index with its own round trip
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    missing_tables = [table for table in Base.metadata.sorted_tables if table.name not in existing_tables]
+    if missing_tables:
+        Base.metadata.create_all(connection, tables=missing_tables)
+    if connection.dialect.name == "sqlite":
+        rebuild_sqlite_cascade_tables(connection, inspector, existing_tables)
+    existing_indexes = {index["name"] for indexes in inspector.get_multi_indexes().values() for index in indexes}
+    for index in SCHEMA_INDEXES:
+        if index.table.name in existing_tables and index.name not in existing_indexes:
+            index.create(connection)
+    if connection.dialect.name == "postgresql":
+        create_updated_at_triggers(connection)
+        cascade_foreign_keys(connection)
+
+if __name__ == "__main__":
+    with engine.begin() as connection:
+        create_schema(connection)
+    print("Database schema is up to date")
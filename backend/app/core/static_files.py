@@ -0,0 +1,24 @@
+import os
+
+from fastapi.staticfiles import StaticFiles
+from starlette.types import Scope
+
+# Next.js puts content-hashed build output under _next/static/, so those files never change
+# under the same URL; everything else (pages, favicon, ...) keeps its URL across deploys
+IMMUTABLE_PREFIX = "_next/static/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that tells browsers how long they may reuse each file.
+
+    Hashed build assets are cached for a year without revalidation; other files are
+    revalidated on every use, which costs a 304 thanks to StaticFiles' ETag/Last-Modified.
+    """
+
+    async def get_response(self, path: str, scope: Scope):
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            immutable = path.replace(os.sep, "/").startswith(IMMUTABLE_PREFIX)
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        return response
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List
+
+from decouple import config
+from sqlalchemy import and_, case, desc, extract, func, insert, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.models.service import Service, ServiceStatus, ServiceStatusHistory, ServiceUptimeDaily
+
+logger = logging.getLogger(__name__)
+
+# Completed days kept rolled up (the status page uptime window)
+UPTIME_WINDOW_DAYS = 30
+
+# Seconds between rollup runs inside each app process; 0 disables the in-process job
+# (e.g. when `python -m app.core.uptime` runs from cron instead)
+UPTIME_ROLLUP_INTERVAL = config("UPTIME_ROLLUP_INTERVAL", default=3600, cast=int)
+
+def start_of_day(moment: datetime) -> datetime:
+    """Midnight UTC of the day moment falls on"""
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+async def get_operational_seconds(
+    db: AsyncSession,
+    service_ids: List[int],
+    start: datetime,
+    end: datetime
+) -> Dict[int, float]:
+    """Seconds each service spent operational between start and end (aware UTC datetimes).
+
+    A service is in the status of its latest history entry, and operational before its first one.
+    """
+    if not service_ids:
+        return {}
+
+    start_epoch, end_epoch = start.timestamp(), end.timestamp()
+    naive_start, naive_end = start.replace(tzinfo=None), end.replace(tzinfo=None)
+
+    # Status each service was in when the range starts
+    status_at_start = select(ServiceStatusHistory.status).where(
+        and_(
+            ServiceStatusHistory.service_id == Service.id,
+            ServiceStatusHistory.created_at < naive_start
+        )
+    ).order_by(
+        desc(ServiceStatusHistory.created_at), desc(ServiceStatusHistory.id)
+    ).limit(1).correlate(Service).scalar_subquery()
+    initial_statuses = dict((await db.execute(
+        select(Service.id, status_at_start).where(Service.id.in_(service_ids))
+    )).all())
+
+    # Each change inside the range lasts until the next one (or until the range ends)
+    created_epoch = extract("epoch", ServiceStatusHistory.created_at)
+    entries = select(
+        ServiceStatusHistory.service_id,
+        created_epoch.label("at"),
+        case((ServiceStatusHistory.status == ServiceStatus.OPERATIONAL, 1), else_=0).label("operational"),
+        func.lead(created_epoch).over(
+            partition_by=ServiceStatusHistory.service_id,
+            order_by=(created_epoch, ServiceStatusHistory.id)
+        ).label("next_at")
+    ).where(
+        and_(
+            ServiceStatusHistory.service_id.in_(service_ids),
+            ServiceStatusHistory.created_at >= naive_start,
+            ServiceStatusHistory.created_at < naive_end
+        )
+    ).subquery()
+
+    rows = (await db.execute(
+        select(
+            entries.c.service_id,
+            func.min(entries.c.at),
+            func.sum(case(
+                (entries.c.operational == 1, func.coalesce(entries.c.next_at, end_epoch) - entries.c.at),
+                else_=0
+            ))
+        ).group_by(entries.c.service_id)
+    )).all()
+    changes = {service_id: (float(first_change), float(operational_between)) for service_id, first_change, operational_between in rows}
+
+    operational_seconds = {}
+    for service_id in service_ids:
+        first_change, operational_between = changes.get(service_id, (end_epoch, 0.0))
+        initial_status = initial_statuses.get(service_id)
+        lead_in = first_change - start_epoch if initial_status in (None, ServiceStatus.OPERATIONAL) else 0.0
+        operational_seconds[service_id] = lead_in + operational_between
+    return operational_seconds
+
+async def roll_up_uptime(db: AsyncSession, days: int = UPTIME_WINDOW_DAYS) -> int:
+    """Store operational seconds for every active service and completed day in the window that lacks them.
+
+    Returns the number of rows written.
+    """
+    service_ids = (await db.scalars(select(Service.id).where(Service.is_active == True))).all()
+    if not service_ids:
+        return 0
+
+    today = start_of_day(datetime.now(timezone.utc))
+    first_day = today - timedelta(days=days)
+    existing = set((await db.execute(
+        select(ServiceUptimeDaily.service_id, ServiceUptimeDaily.day).where(
+            ServiceUptimeDaily.day >= first_day.date()
+        )
+    )).all())
+
+    rows = []
+    for offset in range(days):
+        day_start = first_day + timedelta(days=offset)
+        missing = [service_id for service_id in service_ids if (service_id, day_start.date()) not in existing]
+        if not missing:
+            continue
+        seconds = await get_operational_seconds(db, missing, day_start, day_start + timedelta(days=1))
+        rows.extend(
+            {"service_id": service_id, "day": day_start.date(), "operational_seconds": seconds[service_id]}
+            for service_id in missing
+        )
+
+    if rows:
+        try:
+            await db.execute(insert(ServiceUptimeDaily), rows)
+            await db.commit()
+        except IntegrityError:
+            # Another process rolled up the same days first
+            await db.rollback()
+            return 0
+    return len(rows)
+
+async def get_uptime_rollups(db: AsyncSession, service_ids: List[int], first_day: datetime, end_day: datetime) -> Dict[int, Dict[date, float]]:
+    """Rolled-up operational seconds per service and day in [first_day, end_day)"""
+    if not service_ids:
+        return {}
+    rows = (await db.execute(
+        select(
+            ServiceUptimeDaily.service_id,
+            ServiceUptimeDaily.day,
+            ServiceUptimeDaily.operational_seconds
+        ).where(
+            and_(
+                ServiceUptimeDaily.service_id.in_(service_ids),
+                ServiceUptimeDaily.day >= first_day.date(),
+                ServiceUptimeDaily.day < end_day.date()
+            )
+        )
+    )).all()
+    rollups = {}
+    for service_id, day, seconds in rows:
+        rollups.setdefault(service_id, {})[day] = float(seconds)
+    return rollups
+
+async def get_window_operational_seconds(db: AsyncSession, service_ids: List[int], first_day: datetime, now: datetime) -> Dict[int, float]:
+    """Seconds each service spent operational from first_day (midnight UTC) until now.
+
+    Rolled-up days are read from the rollups; every other stretch of the window (today,
+    and any day the rollup job hasn't covered) is computed from the status history,
+    with one query per distinct stretch.
+    """
+    today = start_of_day(now)
+    rollups = await get_uptime_rollups(db, service_ids, first_day, today)
+
+    operational_seconds = {}
+    services_by_gap = {}
+    for service_id in service_ids:
+        rolled_up = rollups.get(service_id, {})
+        operational_seconds[service_id] = sum(rolled_up.values())
+        gap_start = None
+        day = first_day
+        while day < today:
+            if day.date() in rolled_up:
+                if gap_start is not None:
+                    services_by_gap.setdefault((gap_start, day), []).append(service_id)
+                    gap_start = None
+            elif gap_start is None:
+                gap_start = day
+            day += timedelta(days=1)
+        services_by_gap.setdefault((gap_start or today, now), []).append(service_id)
+
+    for (start, end), gap_service_ids in services_by_gap.items():
+        seconds = await get_operational_seconds(db, gap_service_ids, start, end)
+        for service_id in gap_service_ids:
+            operational_seconds[service_id] += seconds[service_id]
+    return operational_seconds
+
+async def run_uptime_rollups(interval: int = UPTIME_ROLLUP_INTERVAL):
+    """Keep the daily rollups current, running once now and then every interval seconds"""
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                written = await roll_up_uptime(db)
+            if written:
+                logger.info(f"Rolled up {written} service uptime days")
+        except SQLAlchemyError as e:
+            logger.warning(f"Uptime rollup failed: {e}")
+        await asyncio.sleep(interval)
+
+async def main():
+    async with AsyncSessionLocal() as db:
+        written = await roll_up_uptime(db)
+    print(f"Rolled up {written} service uptime days")
+
+if __name__ == "__main__":
+    asyncio.run(main())
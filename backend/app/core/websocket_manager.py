@@ -1,120 +1,156 @@
 from fastapi import WebSocket
-from typing import List, Dict
-import json
+from starlette.websockets import WebSocketState
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+from time import time
+import asyncio
 import logging
 
+import orjson
+
 logger = logging.getLogger(__name__)
 
+# Connections sent to at once during a broadcast
+BROADCAST_BATCH_SIZE = 64
+
+# Seconds a single send may take before the client is considered too slow and dropped
+SEND_TIMEOUT = 2.0
+
+# Notifications raised within this many seconds of each other go out as one frame
+NOTIFICATION_BATCH_WINDOW = 0.01
+
+def encode_json(data: dict) -> str:
+    """Encode a message for a text frame with orjson rather than the stdlib encoder send_json uses"""
+    return orjson.dumps(data).decode()
+
+async def send_with_timeout(connection: WebSocket, frame: Union[str, bytes]):
+    """Send a text (str) or binary (bytes) frame, closing the connection if the client doesn't take it within SEND_TIMEOUT"""
+    send = connection.send_bytes if isinstance(frame, bytes) else connection.send_text
+    try:
+        await asyncio.wait_for(send(frame), SEND_TIMEOUT)
+    except asyncio.TimeoutError:
+        # 1011: the server is ending the connection; don't let a stuck close hang either
+        try:
+            await asyncio.wait_for(connection.close(code=1011), SEND_TIMEOUT)
+        except Exception:
+            pass
+        raise asyncio.TimeoutError(f"client did not accept a message within {SEND_TIMEOUT}s")
+
+def partition_connected(connections: Iterable[WebSocket]) -> Tuple[List[WebSocket], List[WebSocket]]:
+    """Split connections into those still open on both ends and those that aren't"""
+    connected, closed = [], []
+    for connection in connections:
+        if connection.client_state == WebSocketState.CONNECTED and connection.application_state == WebSocketState.CONNECTED:
+            connected.append(connection)
+        else:
+            closed.append(connection)
+    return connected, closed
+
 class ConnectionManager:
     def __init__(self):
         # Store active connections
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Set[WebSocket] = set()
         # Store connections by organization for multi-tenant support
-        self.organization_connections: Dict[str, List[WebSocket]] = {}
+        self.organization_connections: Dict[str, Set[WebSocket]] = {}
+        # Organization each organization-scoped connection belongs to, so disconnect needs no scan
+        self.connection_organizations: Dict[WebSocket, str] = {}
+        # Connections that asked for binary frames: the UTF-8 JSON goes out as is, where text
+        # frames get encoded again by the server for every connection
+        self.binary_connections: Set[WebSocket] = set()
+        # Notifications waiting for their batch window to close, by organization (None = everyone)
+        self.pending_notifications: Dict[Optional[str], List[dict]] = {}
+        self.flush_tasks: Dict[Optional[str], asyncio.Task] = {}
 
-    async def connect(self, websocket: WebSocket, organization_id: str = None):
-        """Accept a new WebSocket connection"""
+    async def connect(self, websocket: WebSocket, organization_id: str = None, binary: bool = False):
+        """Accept a new WebSocket connection, sending it binary rather than text frames if asked"""
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
+        if binary:
+            self.binary_connections.add(websocket)
         
         # Add to organization-specific connections if provided
         if organization_id:
-            if organization_id not in self.organization_connections:
-                self.organization_connections[organization_id] = []
-            self.organization_connections[organization_id].append(websocket)
+            self.organization_connections.setdefault(organization_id, set()).add(websocket)
+            self.connection_organizations[websocket] = organization_id
         
         logger.info(f"New WebSocket connection. Total connections: {len(self.active_connections)}")
 
     def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
+        self.binary_connections.discard(websocket)
         
-        # Remove from organization connections
-        for org_id, connections in self.organization_connections.items():
-            if websocket in connections:
-                connections.remove(websocket)
-                break
+        # Remove from its organization's connections, dropping the organization once it has none
+        organization_id = self.connection_organizations.pop(websocket, None)
+        connections = self.organization_connections.get(organization_id)
+        if connections is not None:
+            connections.discard(websocket)
+            if not connections:
+                del self.organization_connections[organization_id]
         
         logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         """Send a message to a specific WebSocket connection"""
-        try:
-            await websocket.send_text(message)
-        except Exception as e:
-            logger.error(f"Error sending personal message: {e}")
-            self.disconnect(websocket)
+        await self.send_to_connections((websocket,), message, "sending personal message")
 
     async def send_json_to_connection(self, data: dict, websocket: WebSocket):
         """Send JSON data to a specific WebSocket connection"""
-        try:
-            await websocket.send_json(data)
-        except Exception as e:
-            logger.error(f"Error sending JSON message: {e}")
-            self.disconnect(websocket)
+        await self.send_to_connections((websocket,), encode_json(data), "sending JSON message")
 
-    async def broadcast_message(self, message: str):
-        """Broadcast a message to all connected clients"""
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting message: {e}")
-                disconnected.append(connection)
+    async def send_to_connections(self, connections: Iterable[WebSocket], message: str, context: str):
+        """Send a message to connections concurrently, dropping the ones that fail.
+
+        Every send goes through here, so batching and error handling apply to all of them.
+        """
+        # Send to a copy: sends await, so connections may come and go meanwhile. Sockets
+        # already closing are dropped up front rather than through a failed send
+        connections, closed = partition_connected(connections)
+        for connection in closed:
+            self.disconnect(connection)
+        
+        # Encoded once for every binary connection
+        binary_frame = message.encode() if not self.binary_connections.isdisjoint(connections) else None
+        
+        # A slow client only delays its own send, not everyone queued behind it, and is
+        # dropped once a send takes longer than SEND_TIMEOUT. Large fan-outs go out in
+        # batches, yielding to the event loop in between so other requests keep being served
+        results = []
+        for start in range(0, len(connections), BROADCAST_BATCH_SIZE):
+            if start:
+                await asyncio.sleep(0)
+            results += await asyncio.gather(
+                *(
+                    send_with_timeout(connection, binary_frame if connection in self.binary_connections else message)
+                    for connection in connections[start:start + BROADCAST_BATCH_SIZE]
+                ),
+                return_exceptions=True
+            )
         
         # Remove disconnected connections
-        for connection in disconnected:
-            self.disconnect(connection)
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error {context}: {result}")
+                self.disconnect(connection)
+
+    async def broadcast_message(self, message: str):
+        """Broadcast a message to all connected clients"""
+        await self.send_to_connections(self.active_connections, message, "broadcasting message")
 
     async def broadcast_json(self, data: dict):
         """Broadcast JSON data to all connected clients"""
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(data)
-            except Exception as e:
-                logger.error(f"Error broadcasting JSON: {e}")
-                disconnected.append(connection)
-        
-        # Remove disconnected connections
-        for connection in disconnected:
-            self.disconnect(connection)
+        # Serialize once rather than once per connection
+        await self.broadcast_message(encode_json(data))
 
     async def broadcast_to_organization(self, message: str, organization_id: str):
         """Broadcast a message to all clients in a specific organization"""
-        if organization_id not in self.organization_connections:
-            return
-        
-        disconnected = []
-        for connection in self.organization_connections[organization_id]:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting to organization: {e}")
-                disconnected.append(connection)
-        
-        # Remove disconnected connections
-        for connection in disconnected:
-            self.disconnect(connection)
+        await self.send_to_connections(
+            self.organization_connections.get(organization_id, ()), message, "broadcasting to organization"
+        )
 
     async def broadcast_json_to_organization(self, data: dict, organization_id: str):
         """Broadcast JSON data to all clients in a specific organization"""
-        if organization_id not in self.organization_connections:
-            return
-        
-        disconnected = []
-        for connection in self.organization_connections[organization_id]:
-            try:
-                await connection.send_json(data)
-            except Exception as e:
-                logger.error(f"Error broadcasting JSON to organization: {e}")
-                disconnected.append(connection)
-        
-        # Remove disconnected connections
-        for connection in disconnected:
-            self.disconnect(connection)
+        # Serialize once rather than once per connection
+        await self.broadcast_to_organization(encode_json(data), organization_id)
 
     async def notify_status_change(self, service_id: str, status: str, organization_id: str = None):
         """Send status change notification"""
@@ -122,13 +158,10 @@ class ConnectionManager:
             "type": "status_change",
             "service_id": service_id,
             "status": status,
-            "timestamp": str(int(__import__('time').time()))
+            "timestamp": int(time())
         }
         
-        if organization_id:
-            await self.broadcast_json_to_organization(notification, organization_id)
-        else:
-            await self.broadcast_json(notification)
+        self.queue_notification(notification, organization_id)
 
     async def notify_incident_update(self, incident_id: str, status: str, organization_id: str = None):
         """Send incident update notification"""
@@ -136,10 +169,38 @@ class ConnectionManager:
             "type": "incident_update",
             "incident_id": incident_id,
             "status": status,
-            "timestamp": str(int(__import__('time').time()))
+            "timestamp": int(time())
         }
         
+        self.queue_notification(notification, organization_id)
+
+    def queue_notification(self, notification: dict, organization_id: str = None):
+        """Queue a notification to be sent with any others raised within the batch window"""
+        self.pending_notifications.setdefault(organization_id, []).append(notification)
+        if organization_id not in self.flush_tasks:
+            self.flush_tasks[organization_id] = asyncio.create_task(
+                self.flush_notifications(organization_id, NOTIFICATION_BATCH_WINDOW)
+            )
+
+    async def flush_notifications(self, organization_id: str = None, delay: float = 0):
+        """Send the queued notifications of an organization, as one batch frame if there are several"""
+        if delay:
+            await asyncio.sleep(delay)
+        self.flush_tasks.pop(organization_id, None)
+        events = self.pending_notifications.pop(organization_id, [])
+        if not events:
+            return
+        
+        data = events[0] if len(events) == 1 else {"type": "batch", "events": events}
         if organization_id:
-            await self.broadcast_json_to_organization(notification, organization_id)
+            await self.broadcast_json_to_organization(data, organization_id)
         else:
-            await self.broadcast_json(notification) 
\ No newline at end of file
+            await self.broadcast_json(data)
+
+    async def flush_now(self):
+        """Send every queued notification immediately (e.g. on shutdown)"""
+        for task in self.flush_tasks.values():
+            task.cancel()
+        self.flush_tasks.clear()
+        for organization_id in list(self.pending_notifications):
+            await self.flush_notifications(organization_id)
@@ -1,30 +1,51 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, FileResponse, ORJSONResponse
 import uvicorn
+import asyncio
+import logging
 import os
+import sys
+from decouple import config
 from contextlib import asynccontextmanager
 from typing import List
 
-from app.core.database import engine, Base
+from app.core.cache import cache
+from app.core.database import async_engine
+from app.core.uptime import UPTIME_ROLLUP_INTERVAL, run_uptime_rollups
+from app.core.schema import AUTO_CREATE_SCHEMA, create_schema
+from app.core.static_files import CachedStaticFiles
 from app.api.v1.router import api_router
 from app.core.websocket_manager import ConnectionManager
 
+logger = logging.getLogger(__name__)
+
+# Exported frontend build, served by the app when present
+STATIC_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "static"))
+
 # Create database tables
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
-    Base.metadata.create_all(bind=engine)
+    # Startup (through the async engine, so the DDL doesn't block the event loop)
+    if AUTO_CREATE_SCHEMA:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(create_schema)
+    # Keep the daily uptime rollups behind the status page current
+    rollup_task = asyncio.create_task(run_uptime_rollups()) if UPTIME_ROLLUP_INTERVAL > 0 else None
     yield
     # Shutdown
-    pass
+    if rollup_task:
+        rollup_task.cancel()
+    await manager.flush_now()
+    await cache.close()
+    await async_engine.dispose()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Status Page API",
     description="A comprehensive status page application API",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -35,6 +56,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After-Id", "X-Next-Cursor"],  # Pagination cursors
 )
 
 # WebSocket manager
@@ -53,15 +75,15 @@ async def health_check():
 app.include_router(api_router, prefix="/api/v1")
 
 # Mount static files for frontend (AFTER API routes)
-static_dir = os.path.join(os.path.dirname(__file__), "..", "static")
-if os.path.exists(static_dir):
-    app.mount("/static", StaticFiles(directory=static_dir), name="static")
-    app.mount("/", StaticFiles(directory=static_dir, html=True), name="frontend")
+if os.path.isdir(STATIC_DIR):
+    app.mount("/static", CachedStaticFiles(directory=STATIC_DIR), name="static")
+    app.mount("/", CachedStaticFiles(directory=STATIC_DIR, html=True), name="frontend")
 
 # WebSocket endpoint for real-time updates
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, binary: bool = False):
+    # ?binary=true: receive the same JSON messages as binary (UTF-8) frames
+    await manager.connect(websocket, binary=binary)
     try:
         while True:
             # Keep connection alive and handle incoming messages
@@ -74,14 +96,8 @@ async def websocket_endpoint(websocket: WebSocket):
 # Global exception handler with proper logging
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
-    import traceback
-    error_traceback = traceback.format_exc()
-    
-    # Log the full error for debugging
-    print(f"[ERROR] Unhandled exception in {request.method} {request.url}")
-    print(f"[ERROR] Exception type: {type(exc).__name__}")
-    print(f"[ERROR] Exception message: {str(exc)}")
-    print(f"[ERROR] Full traceback:\n{error_traceback}")
+    # Formatting the traceback is left to the logging handler
+    logger.error(f"Unhandled exception in {request.method} {request.url}", exc_info=exc)
     
     return JSONResponse(
         status_code=500,
@@ -93,9 +109,16 @@ async def global_exception_handler(request, exc):
     )
 
 if __name__ == "__main__":
+    # Auto-reload only while developing; otherwise WEB_CONCURRENCY workers (one by default,
+    # see start.py) on the C event loop and HTTP parser from uvicorn[standard] (uvloop has
+    # no Windows build)
+    reload = config("ENVIRONMENT", default="development") == "development"
     uvicorn.run(
         "app.main:app", 
         host="0.0.0.0", 
         port=8000, 
-        reload=True
+        reload=reload,
+        workers=None if reload else config("WEB_CONCURRENCY", default=1, cast=int),
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
     ) 
\ No newline at end of file
@@ -1,5 +1,36 @@
-# Database models
-from .user import User, OrganizationMember, UserRole, MembershipStatus
-from .organization import Organization
-from .service import Service, ServiceStatus
-from .incident import Incident, IncidentStatus, IncidentSeverity, IncidentUpdate, Maintenance 
\ No newline at end of file
+# Database models, imported from their modules on first access (PEP 562)
+import importlib
+
+from sqlalchemy import event
+from sqlalchemy.orm import Mapper
+
+MODEL_MODULES = ("user", "organization", "service", "incident")
+
+EXPORTS = {
+    "User": "user",
+    "OrganizationMember": "user",
+    "UserRole": "user",
+    "MembershipStatus": "user",
+    "Organization": "organization",
+    "Service": "service",
+    "ServiceStatus": "service",
+    "Incident": "incident",
+    "IncidentStatus": "incident",
+    "IncidentSeverity": "incident",
+    "IncidentUpdate": "incident",
+    "Maintenance": "incident",
+}
+
+__all__ = list(EXPORTS)
+
+def __getattr__(name):
+    if name not in EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f".{EXPORTS[name]}", __name__), name)
+
+# Relationships name their targets by string, so every model has to be registered
+# before the mappers are configured (on first use), whichever ones were imported
+@event.listens_for(Mapper, "before_configured")
+def import_all_models():
+    for module in MODEL_MODULES:
+        importlib.import_module(f".{module}", __name__)
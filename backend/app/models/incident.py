@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, Text, Table
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, Text, Table, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.core.database import Base, UPDATED_AT_OPTIONS
 import enum
 
 class IncidentStatus(enum.Enum):
@@ -20,8 +20,8 @@ class IncidentSeverity(enum.Enum):
 incident_services = Table(
     'incident_services',
     Base.metadata,
-    Column('incident_id', Integer, ForeignKey('incidents.id')),
-    Column('service_id', Integer, ForeignKey('services.id'))
+    Column('incident_id', Integer, ForeignKey('incidents.id', ondelete='CASCADE')),
+    Column('service_id', Integer, ForeignKey('services.id', ondelete='CASCADE'))
 )
 
 class Incident(Base):
@@ -37,7 +37,7 @@ class Incident(Base):
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     resolved_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), **UPDATED_AT_OPTIONS)
     
     # Foreign keys
     organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
@@ -46,14 +46,21 @@ class Incident(Base):
     # Relationships
     organization = relationship("Organization", back_populates="incidents")
     created_by = relationship("User", back_populates="created_incidents", foreign_keys="Incident.created_by_id")
-    affected_services = relationship("Service", secondary=incident_services, back_populates="incidents")
-    updates = relationship("IncidentUpdate", back_populates="incident", order_by="IncidentUpdate.created_at.desc()")
+    # Child rows are removed by ON DELETE CASCADE, so deleting an incident doesn't load them
+    affected_services = relationship("Service", secondary=incident_services, back_populates="incidents", passive_deletes=True)
+    updates = relationship(
+        "IncidentUpdate",
+        back_populates="incident",
+        order_by="IncidentUpdate.created_at.desc()",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
 
 class IncidentUpdate(Base):
     __tablename__ = "incident_updates"
     
     id = Column(Integer, primary_key=True, index=True)
-    incident_id = Column(Integer, ForeignKey("incidents.id"), nullable=False)
+    incident_id = Column(Integer, ForeignKey("incidents.id", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=False)
     message = Column(Text, nullable=False)
     status = Column(Enum(IncidentStatus), nullable=False)
@@ -64,6 +71,37 @@ class IncidentUpdate(Base):
     # Relationships
     incident = relationship("Incident", back_populates="updates")
 
+# Composite indexes for the newest-first incident and update listings, which
+# filter on the parent id and page by (created_at, id)
+INCIDENTS_ORG_CREATED_INDEX = Index(
+    "ix_incidents_org_created",
+    Incident.organization_id,
+    Incident.created_at,
+    Incident.id
+)
+INCIDENT_UPDATES_INCIDENT_CREATED_INDEX = Index(
+    "ix_updates_incident_created",
+    IncidentUpdate.incident_id,
+    IncidentUpdate.created_at,
+    IncidentUpdate.id
+)
+
+# Public status page lookups: unresolved incidents by status, and recently resolved
+# ones by resolved_at (partial, since only resolved incidents have one worth sorting)
+INCIDENTS_ORG_STATUS_CREATED_INDEX = Index(
+    "ix_incidents_org_status_created",
+    Incident.organization_id,
+    Incident.status,
+    Incident.created_at
+)
+INCIDENTS_ORG_RESOLVED_INDEX = Index(
+    "ix_incidents_org_resolved",
+    Incident.organization_id,
+    Incident.resolved_at,
+    postgresql_where=Incident.status == IncidentStatus.RESOLVED,
+    sqlite_where=Incident.status == IncidentStatus.RESOLVED
+)
+
 class Maintenance(Base):
     __tablename__ = "maintenances"
     
@@ -83,7 +121,7 @@ class Maintenance(Base):
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), **UPDATED_AT_OPTIONS)
     
     # Foreign keys
     organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
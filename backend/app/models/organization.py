@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.core.database import Base, UPDATED_AT_OPTIONS
 
 class Organization(Base):
     __tablename__ = "organizations"
@@ -20,7 +20,7 @@ class Organization(Base):
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), **UPDATED_AT_OPTIONS)
     
     # Relationships
     members = relationship("OrganizationMember", back_populates="organization")
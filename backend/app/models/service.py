@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Float, ForeignKey, Enum, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.core.database import Base, UPDATED_AT_OPTIONS
 import enum
 
 class ServiceStatus(enum.Enum):
@@ -34,7 +34,7 @@ class Service(Base):
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), **UPDATED_AT_OPTIONS)
     last_status_change = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -57,4 +57,36 @@ class ServiceStatusHistory(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
-    service = relationship("Service", back_populates="status_history") 
\ No newline at end of file
+    service = relationship("Service", back_populates="status_history") 
+
+class ServiceUptimeDaily(Base):
+    """Operational seconds per service and completed UTC day, rolled up from status history"""
+    __tablename__ = "service_uptime_daily"
+    
+    service_id = Column(Integer, ForeignKey("services.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    operational_seconds = Column(Float, nullable=False)
+
+# Composite index for per-service history range scans (uptime metrics, status history),
+# ending in id so keyset pages on (created_at, id) come straight off the index
+SERVICE_STATUS_HISTORY_SERVICE_CREATED_INDEX = Index(
+    "ix_status_history_service_created_id",
+    ServiceStatusHistory.service_id,
+    ServiceStatusHistory.created_at,
+    ServiceStatusHistory.id
+)
+
+# Active-service listings filter by organization and sort by (sort_order, name)
+SERVICES_ORG_ACTIVE_SORT_INDEX = Index(
+    "ix_services_org_active_sort",
+    Service.organization_id,
+    Service.is_active,
+    Service.sort_order,
+    Service.name
+)
+
+# The rollup job looks up which recent days are already rolled up across all services
+SERVICE_UPTIME_DAILY_DAY_INDEX = Index(
+    "ix_uptime_daily_day",
+    ServiceUptimeDaily.day
+)
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.core.database import Base, UPDATED_AT_OPTIONS
 import enum
 
 class UserRole(enum.Enum):
@@ -25,13 +25,21 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), **UPDATED_AT_OPTIONS)
     
     # Relationships  
     organizations = relationship("OrganizationMember", back_populates="user", foreign_keys="OrganizationMember.user_id")
     created_services = relationship("Service", back_populates="created_by")
     created_incidents = relationship("Incident", back_populates="created_by")
 
+# Partial index for login lookups, which only ever match active accounts
+USERS_ACTIVE_EMAIL_INDEX = Index(
+    "users_active_email",
+    User.email,
+    postgresql_where=User.is_active,
+    sqlite_where=User.is_active
+)
+
 class OrganizationMember(Base):
     __tablename__ = "organization_members"
     
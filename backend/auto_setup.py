@@ -5,90 +5,123 @@ Automatic PostgreSQL Setup Script for Status Page Application
 
 import sys
 import os
+from typing import NamedTuple
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 from psycopg2 import sql
+from sqlalchemy import func, insert, or_, select
 from sqlalchemy.orm import Session
 
 # Load environment variables from .env file (local) or environment (Heroku)
 from decouple import config
 
+# Heroku provides DATABASE_URL; locally the DB_* settings come from .env
+DATABASE_URL = os.environ.get('DATABASE_URL')
+DB_NAME = config("DB_NAME", default="status_page_db")
+DB_USER = config("DB_USER", default="postgres")
+DB_PASSWORD = config("DB_PASSWORD", default="")
+DB_HOST = config("DB_HOST", default="localhost")
+DB_PORT = config("DB_PORT", default="5432")
+
+# Password given to every seeded admin
+ADMIN_PASSWORD = config("ADMIN_PASSWORD", default="admin123")
+
 # Check if we're running on Heroku (has DATABASE_URL) or locally (needs .env)
-if not os.environ.get('DATABASE_URL') and not os.path.exists('.env'):
+if not DATABASE_URL and not os.path.exists('.env'):
     print("[ERROR] .env file not found and no DATABASE_URL environment variable!")
     print("[INFO] Please create .env file from env.template:")
     print("   cp env.template .env")
     print("   # Then edit .env with your actual PostgreSQL credentials")
     sys.exit(1)
 
-from app.core.database import engine, Base, get_db
-from app.core.auth import get_password_hash
-from app.models.user import User, OrganizationMember, UserRole, MembershipStatus
-from app.models.organization import Organization
+class OrganizationSeed(NamedTuple):
+    """An organization to create, with its admin account"""
+    name: str
+    slug: str
+    description: str
+    website_url: str
+    admin_email: str
+    admin_name: str
+    admin_username: str
+
+ORGANIZATION_SEEDS = (
+    OrganizationSeed(
+        name="Tech Corp",
+        slug="tech-corp",
+        description="Leading technology solutions company",
+        website_url="https://tech-corp.com",
+        admin_email="admin@tech-corp.com",
+        admin_name="Tech Corp Admin",
+        admin_username="techcorp_admin"
+    ),
+    OrganizationSeed(
+        name="Health Plus",
+        slug="health-plus",
+        description="Healthcare and wellness services",
+        website_url="https://health-plus.com",
+        admin_email="admin@health-plus.com",
+        admin_name="Health Plus Admin",
+        admin_username="healthplus_admin"
+    ),
+    OrganizationSeed(
+        name="Retail Pro",
+        slug="retail-pro",
+        description="E-commerce and retail solutions",
+        website_url="https://retail-pro.com",
+        admin_email="admin@retail-pro.com",
+        admin_name="Retail Pro Admin",
+        admin_username="retailpro_admin"
+    )
+)
 
 def create_database():
     """Create PostgreSQL database if it doesn't exist"""
     try:
         # Check if we have DATABASE_URL (Heroku) or individual config vars (local)
-        database_url = os.environ.get('DATABASE_URL')
-        
-        if database_url:
+        if DATABASE_URL:
             # On Heroku, use DATABASE_URL
-            print(f"[CONNECT] Using Heroku DATABASE_URL...")
-            # Heroku PostgreSQL databases are already created, just verify connection
-            import urllib.parse
-            result = urllib.parse.urlparse(database_url)
-            
-            # Test connection to the actual database
-            conn = psycopg2.connect(
-                host=result.hostname,
-                port=result.port,
-                database=result.path[1:],  # Remove leading slash
-                user=result.username,
-                password=result.password
-            )
-            print(f"[OK] Connected to Heroku PostgreSQL database")
-            conn.close()
+            print("[CONNECT] Using Heroku DATABASE_URL...")
+            # Heroku PostgreSQL databases are already created, just verify connection.
+            # Go through the app engine: its pool keeps the connection for the schema
+            # and seeding steps that follow instead of opening a second one
+            from app.core.database import engine
+            with engine.connect():
+                pass
+            print("[OK] Connected to Heroku PostgreSQL database")
             return True
         else:
-            # Local development - get connection details from environment variables
-            db_name = config("DB_NAME", default="status_page_db")
-            username = config("DB_USER", default="postgres")
-            password = config("DB_PASSWORD", default="")
-            host = config("DB_HOST", default="localhost")
-            port = config("DB_PORT", default="5432")
-            
-            if not password:
+            # Local development - connection details come from the DB_* settings
+            if not DB_PASSWORD:
                 print("[ERROR] Database password not found in environment!")
                 print("[INFO] Please set DB_PASSWORD in your .env file")
                 return False
             
-            print(f"[CONNECT] Connecting to PostgreSQL server...")
+            print("[CONNECT] Connecting to PostgreSQL server...")
             
             # Connect to PostgreSQL server (to postgres database)
             conn = None
             cursor = None
             try:
                 conn = psycopg2.connect(
-                    host=host,
-                    port=port,
+                    host=DB_HOST,
+                    port=DB_PORT,
                     database='postgres',  # Connect to default postgres database
-                    user=username,
-                    password=password
+                    user=DB_USER,
+                    password=DB_PASSWORD
                 )
                 conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
                 cursor = conn.cursor()
                 
                 # Check if database exists
-                cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (db_name,))
+                cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (DB_NAME,))
                 exists = cursor.fetchone()
                 
                 if not exists:
                     # Use identifier escaping for database name to prevent SQL injection
-                    cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(db_name)))
-                    print(f"[OK] Created database: {db_name}")
+                    cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(DB_NAME)))
+                    print(f"[OK] Created database: {DB_NAME}")
                 else:
-                    print(f"[OK] Database already exists: {db_name}")
+                    print(f"[OK] Database already exists: {DB_NAME}")
                 
                 return True
                 
@@ -100,125 +133,128 @@ def create_database():
         
     except Exception as e:
         print(f"[ERROR] Failed to create database: {e}")
-        print(f"[INFO] Make sure PostgreSQL is running and password is correct")
+        print("[INFO] Make sure PostgreSQL is running and password is correct")
         return False
 
 def setup_organizations_and_admins():
     """Set up organizations with admin accounts"""
+    # The app (engine, models, password hashing) is only loaded once it's needed
+    from app.core.database import engine, get_db
+    from app.core.schema import create_schema
+    from app.core.auth import get_password_hash
+    from app.models.user import User, OrganizationMember, UserRole, MembershipStatus
+    from app.models.organization import Organization
+    
     try:
-        print(f"[SETUP] Creating database tables...")
+        print("[SETUP] Creating database tables...")
         # Create all tables
-        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            create_schema(connection)
         print("[OK] Database tables created")
         
         # Get database session
         db = next(get_db())
         
         try:
-            organizations_data = [
-                {
-                    "name": "Tech Corp",
-                    "slug": "tech-corp", 
-                    "description": "Leading technology solutions company",
-                    "website_url": "https://tech-corp.com",
-                    "admin_email": "admin@tech-corp.com",
-                    "admin_name": "Tech Corp Admin",
-                    "admin_username": "techcorp_admin"
-                },
-                {
-                    "name": "Health Plus",
-                    "slug": "health-plus",
-                    "description": "Healthcare and wellness services",
-                    "website_url": "https://health-plus.com", 
-                    "admin_email": "admin@health-plus.com",
-                    "admin_name": "Health Plus Admin",
-                    "admin_username": "healthplus_admin"
-                },
-                {
-                    "name": "Retail Pro",
-                    "slug": "retail-pro",
-                    "description": "E-commerce and retail solutions",
-                    "website_url": "https://retail-pro.com",
-                    "admin_email": "admin@retail-pro.com", 
-                    "admin_name": "Retail Pro Admin",
-                    "admin_username": "retailpro_admin"
-                }
-            ]
-            
             created_accounts = []
-            # Use environment variable for admin password or default
-            admin_password = config("ADMIN_PASSWORD", default="admin123")
             
             print("\n[ORG] Setting up Organizations with Admin Accounts")
             print("=" * 60)
             
-            for org_data in organizations_data:
+            # Skip organizations, or admins, that already exist (one lookup each for all of them).
+            # Everything is inserted in one transaction, so any unique value that's already
+            # taken has to be filtered out here rather than fail the whole seed
+            existing_slugs = set(db.scalars(
+                select(Organization.slug).where(Organization.slug.in_([org.slug for org in ORGANIZATION_SEEDS]))
+            ))
+            existing_users = db.execute(
+                select(User.email, User.username).where(or_(
+                    User.email.in_([org.admin_email for org in ORGANIZATION_SEEDS]),
+                    User.username.in_([org.admin_username for org in ORGANIZATION_SEEDS])
+                ))
+            ).all()
+            existing_emails = {email for email, _ in existing_users}
+            existing_usernames = {username for _, username in existing_users}
+            new_organizations = []
+            for org_data in ORGANIZATION_SEEDS:
+                if org_data.slug in existing_slugs:
+                    print(f"[WARN] Organization '{org_data.name}' already exists, skipping...")
+                elif org_data.admin_email in existing_emails:
+                    print(f"[WARN] Admin user '{org_data.admin_email}' already exists, skipping...")
+                elif org_data.admin_username in existing_usernames:
+                    print(f"[WARN] Username '{org_data.admin_username}' is already taken, skipping...")
+                else:
+                    new_organizations.append(org_data)
+            
+            if new_organizations:
+                # Every admin gets the same password, and hashing is deliberately slow: hash it once
+                hashed_admin_password = get_password_hash(ADMIN_PASSWORD)
                 try:
-                    # Check if organization already exists
-                    existing_org = db.query(Organization).filter(Organization.slug == org_data["slug"]).first()
-                    if existing_org:
-                        print(f"[WARN] Organization '{org_data['name']}' already exists, skipping...")
-                        continue
-                        
-                    # Check if admin user already exists
-                    existing_user = db.query(User).filter(User.email == org_data["admin_email"]).first()
-                    if existing_user:
-                        print(f"[WARN] Admin user '{org_data['admin_email']}' already exists, skipping...")
-                        continue
+                    # One multi-row INSERT per table, all in one transaction; RETURNING gives
+                    # the new ids in the same order as the rows
+                    organization_ids = db.scalars(
+                        insert(Organization).returning(Organization.id, sort_by_parameter_order=True),
+                        [
+                            {
+                                "name": org_data.name,
+                                "slug": org_data.slug,
+                                "description": org_data.description,
+                                "website_url": org_data.website_url,
+                                "is_public": True,
+                                "branding_enabled": True
+                            }
+                            for org_data in new_organizations
+                        ]
+                    ).all()
                     
-                    # Create organization
-                    organization = Organization(
-                        name=org_data["name"],
-                        slug=org_data["slug"],
-                        description=org_data["description"],
-                        website_url=org_data["website_url"],
-                        is_public=True,
-                        branding_enabled=True
-                    )
-                    db.add(organization)
-                    db.flush()  # Get the ID
+                    admin_ids = db.scalars(
+                        insert(User).returning(User.id, sort_by_parameter_order=True),
+                        [
+                            {
+                                "email": org_data.admin_email,
+                                "username": org_data.admin_username,
+                                "full_name": org_data.admin_name,
+                                "hashed_password": hashed_admin_password,
+                                "is_active": True,
+                                "is_verified": True
+                            }
+                            for org_data in new_organizations
+                        ]
+                    ).all()
                     
-                    # Create admin user
-                    admin_user = User(
-                        email=org_data["admin_email"],
-                        username=org_data["admin_username"], 
-                        full_name=org_data["admin_name"],
-                        hashed_password=get_password_hash(admin_password),
-                        is_active=True,
-                        is_verified=True
+                    # Admin memberships (auto-approved, self-approved)
+                    db.execute(
+                        insert(OrganizationMember).values(approved_at=func.now()),
+                        [
+                            {
+                                "user_id": admin_id,
+                                "organization_id": organization_id,
+                                "requested_role": UserRole.ADMIN,
+                                "role": UserRole.ADMIN,
+                                "status": MembershipStatus.APPROVED,
+                                "approved_by": admin_id
+                            }
+                            for organization_id, admin_id in zip(organization_ids, admin_ids)
+                        ]
                     )
-                    db.add(admin_user)
-                    db.flush()  # Get the ID
-                    
-                    # Create admin membership (auto-approved)
-                    from sqlalchemy.sql import func
-                    admin_membership = OrganizationMember(
-                        user_id=admin_user.id,
-                        organization_id=organization.id,
-                        requested_role=UserRole.ADMIN,
-                        role=UserRole.ADMIN,
-                        status=MembershipStatus.APPROVED,
-                        approved_by=admin_user.id,  # Self-approved
-                        approved_at=func.now()
-                    )
-                    db.add(admin_membership)
                     
                     db.commit()
-                    
-                    # Store credentials
-                    created_accounts.append({
-                        "organization": org_data["name"],
-                        "slug": org_data["slug"],
-                        "admin_email": org_data["admin_email"],
-                        "admin_password": admin_password,
-                        "status_url": f"http://localhost:3000/status/{org_data['slug']}"
-                    })
-                    
-                    print(f"[OK] Created: {org_data['name']} with admin {org_data['admin_email']}")
-                    
                 except Exception as e:
-                    print(f"[ERROR] Error creating {org_data['name']}: {str(e)}")
+                    print(f"[ERROR] Error creating organizations: {str(e)}")
                     db.rollback()
+                    new_organizations = []
+            
+            for org_data in new_organizations:
+                # Store credentials
+                created_accounts.append({
+                    "organization": org_data.name,
+                    "slug": org_data.slug,
+                    "admin_email": org_data.admin_email,
+                    "admin_password": ADMIN_PASSWORD,
+                    "status_url": f"http://localhost:3000/status/{org_data.slug}"
+                })
+                
+                print(f"[OK] Created: {org_data.name} with admin {org_data.admin_email}")
             
             # Print credentials summary
             print("\n" + "=" * 60)
@@ -230,7 +266,7 @@ def setup_organizations_and_admins():
                 print(f"   [EMAIL] Email: {account['admin_email']}")
                 print(f"   [PASS] Password: {account['admin_password']}")
                 print(f"   [URL] Status Page: {account['status_url']}")
-                print(f"   [CONNECT] Login: http://localhost:3000/login")
+                print("   [CONNECT] Login: http://localhost:3000/login")
             
             print(f"\n[SETUP] Total Organizations Created: {len(created_accounts)}")
             print("[INFO] These admins can now approve/deny membership requests!")
@@ -251,17 +287,17 @@ def main():
     print("=" * 50)
     
     # Create database
-    print(f"\n[SETUP] Creating database: status_page_db")
+    print("\n[SETUP] Creating database: status_page_db")
     if not create_database():
         sys.exit(1)
     
     # Setup organizations and admins
-    print(f"\n[ORG] Setting up organizations and admin accounts...")
+    print("\n[ORG] Setting up organizations and admin accounts...")
     if not setup_organizations_and_admins():
         sys.exit(1)
     
-    print(f"\n[OK] PostgreSQL setup complete!")
-    print(f"\n[RUN] You can now start the backend server with: python start.py")
+    print("\n[OK] PostgreSQL setup complete!")
+    print("\n[RUN] You can now start the backend server with: python start.py")
     
 if __name__ == "__main__":
     main() 
\ No newline at end of file
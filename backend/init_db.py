@@ -11,17 +11,25 @@ from datetime import datetime, timedelta
 # Add the app directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.core.database import engine, Base, SessionLocal
+from decouple import config
+from sqlalchemy import insert
+
+from app.core.database import engine, SessionLocal
+from app.core.schema import create_schema
 from app.models.user import User, OrganizationMember, UserRole
 from app.models.organization import Organization
 from app.models.service import Service, ServiceStatus, ServiceStatusHistory
 from app.models.incident import Incident, IncidentStatus, IncidentSeverity, IncidentUpdate
 from app.core.auth import get_password_hash
 
+# Answers the sample data prompt for unattended runs (true/false)
+CREATE_SAMPLE_DATA = config("CREATE_SAMPLE_DATA", default="")
+
 def init_database():
     """Initialize database tables"""
     print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        create_schema(connection)
     print("[OK] Database tables created successfully!")
 
 def create_sample_data():
@@ -48,8 +56,6 @@ def create_sample_data():
             is_verified=True
         )
         db.add(sample_user)
-        db.commit()
-        db.refresh(sample_user)
         print(f"   [OK] User created: {sample_user.email}")
         
         # Create sample organization
@@ -63,20 +69,17 @@ def create_sample_data():
             branding_enabled=True
         )
         db.add(sample_org)
-        db.commit()
-        db.refresh(sample_org)
         print(f"   [OK] Organization created: {sample_org.name}")
         
         # Add user to organization as admin
         print("[MEMBER] Adding user to organization...")
         membership = OrganizationMember(
-            user_id=sample_user.id,
-            organization_id=sample_org.id,
+            user=sample_user,
+            organization=sample_org,
             role=UserRole.ADMIN
         )
         db.add(membership)
-        db.commit()
-        print(f"   [OK] User added as admin to organization")
+        print("   [OK] User added as admin to organization")
         
         # Create sample services
         print("[SERVICE] Creating sample services...")
@@ -122,49 +125,43 @@ def create_sample_data():
                 monitoring_url=service_data.get("monitoring_url"),
                 monitoring_enabled=service_data["monitoring_enabled"],
                 sort_order=service_data["sort_order"],
-                organization_id=sample_org.id,
-                created_by_id=sample_user.id
+                organization=sample_org,
+                created_by=sample_user
             )
             db.add(service)
             services.append(service)
         
-        db.commit()
-        
-        # Refresh services to get IDs
+        # One flush inserts everything so far in dependency order (the services with one
+        # INSERT ... RETURNING) to get their IDs, then their initial status history goes
+        # in with one INSERT
+        db.flush()
         for service in services:
-            db.refresh(service)
             print(f"   [OK] Service created: {service.name} ({service.status.value})")
-            
-            # Create initial status history
-            status_history = ServiceStatusHistory(
-                service_id=service.id,
-                status=service.status,
-                reason="Initial service setup",
-                automated=False
-            )
-            db.add(status_history)
-        
-        db.commit()
+        db.execute(insert(ServiceStatusHistory), [
+            {
+                "service_id": service.id,
+                "status": service.status,
+                "reason": "Initial service setup",
+                "automated": False
+            }
+            for service in services
+        ])
         
         # Create sample incident
         print("[INCIDENT] Creating sample incident...")
+        # Linked to the database service
+        database_service = next((s for s in services if s.name == "Database"), None)
         sample_incident = Incident(
             title="Database Performance Issues",
             description="We are experiencing slower response times due to database performance issues. Our team is investigating and working on a resolution.",
             status=IncidentStatus.MONITORING,
             severity=IncidentSeverity.MEDIUM,
-            organization_id=sample_org.id,
-            created_by_id=sample_user.id
+            organization=sample_org,
+            created_by=sample_user,
+            affected_services=[database_service] if database_service else []
         )
         db.add(sample_incident)
-        db.commit()
-        db.refresh(sample_incident)
-        
-        # Link incident to database service
-        database_service = next((s for s in services if s.name == "Database"), None)
-        if database_service:
-            sample_incident.affected_services.append(database_service)
-            db.commit()
+        db.flush()  # Get the ID
         
         print(f"   [OK] Incident created: {sample_incident.title}")
         
@@ -191,21 +188,14 @@ def create_sample_data():
             }
         ]
         
-        for i, update_data in enumerate(updates_data):
-            incident_update = IncidentUpdate(
-                incident_id=sample_incident.id,
-                title=update_data["title"],
-                message=update_data["message"],
-                status=update_data["status"]
-            )
-            # Manually set created_at to simulate timeline
-            db.add(incident_update)
-            db.commit()
-            db.refresh(incident_update)
-            
-            # Update the incident status to match latest update
-            if i == len(updates_data) - 1:  # Last update
-                sample_incident.status = update_data["status"]
+        # One INSERT for all updates, with created_at set to simulate the timeline
+        db.execute(insert(IncidentUpdate), [
+            {"incident_id": sample_incident.id, **update_data}
+            for update_data in updates_data
+        ])
+        
+        # Update the incident status to match latest update
+        sample_incident.status = updates_data[-1]["status"]
         
         db.commit()
         print(f"   [OK] Created {len(updates_data)} incident updates")
@@ -215,10 +205,10 @@ def create_sample_data():
         print(f"   [USER] User: {sample_user.email} (password: password123)")
         print(f"   [ORG] Organization: {sample_org.name} (slug: {sample_org.slug})")
         print(f"   [SERVICE] Services: {len(services)} services created")
-        print(f"   [INCIDENT] Incidents: 1 sample incident with updates")
-        print(f"\n[INFO] Access URLs:")
-        print(f"   [API] API Documentation: http://localhost:8000/docs")
-        print(f"   [LOGIN] Login endpoint: http://localhost:8000/api/v1/auth/login")
+        print("   [INCIDENT] Incidents: 1 sample incident with updates")
+        print("\n[INFO] Access URLs:")
+        print("   [API] API Documentation: http://localhost:8000/docs")
+        print("   [LOGIN] Login endpoint: http://localhost:8000/api/v1/auth/login")
         print(f"   [STATUS] Public status: http://localhost:8000/api/v1/status/{sample_org.slug}")
         
     except Exception as e:
@@ -237,17 +227,24 @@ def main():
         # Initialize database
         init_database()
         
-        # Ask user if they want sample data
-        while True:
-            create_samples = input("\n[TIP] Create sample data for testing? (y/n): ").lower().strip()
-            if create_samples in ['y', 'yes']:
-                create_sample_data()
-                break
-            elif create_samples in ['n', 'no']:
-                print("[OK] Database initialized without sample data.")
-                break
-            else:
+        # Take the answer from CREATE_SAMPLE_DATA, else ask user if they want sample data;
+        # without a terminal to ask (CI, release steps) don't create any
+        if CREATE_SAMPLE_DATA:
+            create_samples = CREATE_SAMPLE_DATA.lower().strip() in ['1', 'true', 'y', 'yes', 'on']
+        elif sys.stdin.isatty():
+            while True:
+                answer = input("\n[TIP] Create sample data for testing? (y/n): ").lower().strip()
+                if answer in ['y', 'yes', 'n', 'no']:
+                    create_samples = answer in ['y', 'yes']
+                    break
                 print("Please enter 'y' or 'n'")
+        else:
+            create_samples = False
+        
+        if create_samples:
+            create_sample_data()
+        else:
+            print("[OK] Database initialized without sample data.")
         
         print("\n[NEXT] Next Steps:")
         print("1. Start the API server: python start.py")
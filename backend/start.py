@@ -2,38 +2,62 @@
 """
 Startup script for the Status Page API
 """
-import uvicorn
 import os
 import sys
 
 if __name__ == "__main__":
-    # Load environment variables from .env file
-    from decouple import config
+    from decouple import Config, RepositoryEmpty, RepositoryEnv
     
-    # Check if .env file exists
-    if not os.path.exists('.env'):
-        print("[ERROR] .env file not found!")
-        print("Note: Please create a .env file from env.template and set your actual values")
-        print("   cp env.template .env")
-        print("   # Then edit .env with your actual database credentials and secret key")
-        sys.exit(1)
+    if "DATABASE_URL" in os.environ and "SECRET_KEY" in os.environ:
+        # Settings injected as real environment variables (containers, Heroku): no .env needed
+        config = Config(RepositoryEmpty())
+    else:
+        # Load environment variables from .env file (opening it is also the existence check)
+        try:
+            config = Config(RepositoryEnv('.env'))
+        except FileNotFoundError:
+            print("[ERROR] .env file not found!")
+            print("Note: Please create a .env file from env.template and set your actual values")
+            print("   cp env.template .env")
+            print("   # Then edit .env with your actual database credentials and secret key")
+            sys.exit(1)
     
     # Try to load required environment variables using decouple
     try:
         database_url = config('DATABASE_URL')
         secret_key = config('SECRET_KEY')
-        print("[OK] Environment variables loaded successfully")
-        print(f"[OK] Database URL configured")
-        print(f"[OK] Secret key configured")
+        print(
+            "[OK] Environment variables loaded successfully\n"
+            "[OK] Database URL configured\n"
+            "[OK] Secret key configured"
+        )
     except Exception as e:
         print(f"[ERROR] Error loading environment variables: {e}")
         print("Note: Please check your .env file format")
         sys.exit(1)
     
+    # Hand the checked values to the server processes (environment variables take precedence
+    # over .env there too), so they run with exactly what was checked here even if the app's
+    # own .env lookup, which searches from app/ upward, would find a different file
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["SECRET_KEY"] = secret_key
+    
+    # Auto-reload (a watcher process re-importing the app on changes) only while
+    # developing, as in app/main.py; otherwise WEB_CONCURRENCY workers, one by default
+    # since each worker opens its own database pool, runs its own uptime rollups and only
+    # broadcasts to its own websocket clients. The event loop and HTTP parser are named
+    # rather than probed for (uvloop has no Windows build)
+    reload = config("ENVIRONMENT", default="development") == "development"
+    
+    # Imported only once the configuration checks pass, so a failed check exits fast
+    import uvicorn
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=reload,
+        workers=None if reload else config("WEB_CONCURRENCY", default=1, cast=int),
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
         log_level="info"
     ) 
\ No newline at end of file
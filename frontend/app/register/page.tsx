@@ -50,8 +50,17 @@ export default function RegisterPage() {
   useEffect(() => {
     const loadOrganizations = async () => {
       try {
-        const response = await api.get('/auth/organizations');
-        setOrganizations(response.data);
+        // Follow the pagination cursor until every page is loaded
+        const loaded: Organization[] = [];
+        let afterId: string | undefined;
+        do {
+          const response = await api.get('/auth/organizations', {
+            params: afterId ? { limit: 200, after_id: afterId } : { limit: 200 },
+          });
+          loaded.push(...response.data);
+          afterId = response.headers['x-next-after-id'];
+        } while (afterId);
+        setOrganizations(loaded);
       } catch (error) {
         console.error('Failed to load organizations:', error);
         setError('Failed to load organizations');